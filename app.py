@@ -10,16 +10,21 @@ from streamlit_mic_recorder import speech_to_text
 from datetime import datetime, timedelta
 import random
 import plotly.graph_objects as go
-import numpy as np
 import base64
 import edge_tts
 import asyncio
 from PIL import Image
 import requests  # Connects to Pathway Backend
+import context_budget
+import geo_index
+import archive
+from scheduler import llm_scheduler, SchedulerBusy, priority_hint, LLM_RPM, MAX_QUEUE
 
 # --- 1. CONFIGURATION ---
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# A RAG answer may wait behind a full backend queue drained at LLM_RPM, plus the call itself
+BACKEND_TIMEOUT_S = float(os.getenv("CHANAKYA_BACKEND_TIMEOUT_S", MAX_QUEUE * 60 / LLM_RPM + 30))
 
 # CRITICAL FIX: Configure the Google AI Library explicitly
 if GEMINI_API_KEY:
@@ -33,33 +38,50 @@ st.set_page_config(
 )
 
 # --- 2. ASSETS & DATABASE (Local Fallbacks) ---
-INTEL_FILE = "intel_feed.csv"
+# Intel is written as one CSV segment per day (archive.py rolls old days into Parquet)
+INTEL_COLUMNS = ["timestamp", "service", "priority", "report", "lat", "lon"]
 ORDERS_FILE = "command_orders.csv"
 
 def init_dbs():
-    if not os.path.exists(INTEL_FILE): 
-        pd.DataFrame(columns=["timestamp", "service", "priority", "report", "lat", "lon"]).to_csv(INTEL_FILE, index=False)
+    os.makedirs(archive.INTEL_DIR, exist_ok=True)
     if not os.path.exists(ORDERS_FILE): 
         pd.DataFrame(columns=["timestamp", "id", "target", "order", "status", "reply"]).to_csv(ORDERS_FILE, index=False)
 
 def load_intel(): 
     init_dbs()
     try: 
-        df = pd.read_csv(INTEL_FILE, on_bad_lines='skip')
-        if 'lat' not in df.columns: df['lat'] = 28.6; df['lon'] = 77.2; df.to_csv(INTEL_FILE, index=False)
+        frames = [pd.read_csv(path, on_bad_lines='skip') for _, path in archive.segments(archive.INTEL_DIR, "intel")]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=INTEL_COLUMNS)
+        if 'lat' not in df.columns: df['lat'] = 28.6; df['lon'] = 77.2
         return df
     except: return pd.DataFrame()
 
+def append_intel(row):
+    path = archive.intel_segment()
+    with archive.feed_lock(path):
+        pd.DataFrame([row], columns=INTEL_COLUMNS).to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
 def load_orders(): init_dbs(); return pd.read_csv(ORDERS_FILE, on_bad_lines='skip')
 
+# Spatial index survives reruns; each rerun only indexes rows appended since the last one
+@st.cache_resource
+def get_geo_index(): return geo_index.GeoIndex()
+
+def intel_geo_index(df):
+    idx = get_geo_index()
+    idx.sync(df)
+    return idx
+
 def update_order_status(order_id, reply_msg):
-    df = load_orders()
-    mask = df['id'] == order_id
-    if mask.any():
-        df.loc[mask, 'status'] = 'EXECUTED'
-        df.loc[mask, 'reply'] = reply_msg
-        df.to_csv(ORDERS_FILE, index=False)
-        return True
+    # Read-modify-write under the feed lock so archive.py cannot compact in between
+    with archive.feed_lock(ORDERS_FILE):
+        df = load_orders()
+        mask = df['id'] == order_id
+        if mask.any():
+            df.loc[mask, 'status'] = 'EXECUTED'
+            df.loc[mask, 'reply'] = reply_msg
+            df.to_csv(ORDERS_FILE, index=False)
+            return True
     return False
 
 # --- 3. VOICE ENGINE ---
@@ -83,12 +105,15 @@ def text_to_speech(text):
     except Exception as e: st.warning(f"Voice Error: {e}")
 
 # --- 4. AI ENGINE (HYBRID: PATHWAY + GEMINI) ---
-def generate_response(prompt, image=None, sys_prompt="", speak=False):
+def generate_response(prompt, image=None, sys_prompt="", speak=False, priority="NORMAL", context=""):
     """
     Routes queries to the appropriate engine:
     - Text Queries -> Pathway Live Backend (for RAG)
     - Image Queries -> Direct Gemini API (Computer Vision)
+    - Document Queries (`context`, e.g. packed VEDA passages) -> Direct Gemini API
+    Every LLM-bound call goes through the shared scheduler (priority, quota, coalescing).
     """
+    tokens = context_budget.estimate_tokens(f"{sys_prompt} {context} {prompt}")
     
     # CASE A: IMAGE ANALYSIS (Uses Direct Gemini)
     if image:
@@ -100,20 +125,38 @@ def generate_response(prompt, image=None, sys_prompt="", speak=False):
             full_prompt = f"{sys_prompt}\nUSER: {prompt}"
             
             # Pass image and text list
-            response = model.generate_content([full_prompt, image])
+            response = llm_scheduler.run(lambda: model.generate_content([full_prompt, image]), priority=priority, prompt_tokens=tokens)
             response_text = response.text
             
             if speak: text_to_speech(response_text.replace("*", ""))
             return response_text
+        except SchedulerBusy: return "COMMANDER: Uplink saturated. Request deferred, retry shortly."
         except Exception as e: return f"COMMANDER: Optical sensors offline. {e}"
 
-    # CASE B: TEXT/INTEL ANALYSIS (Uses Pathway Backend)
+    # CASE B: DOCUMENT ANALYSIS (Uses Direct Gemini)
+    # The packed passages already are the context; sent to the backend they
+    # would become its retrieval query and push the question out of the embedding
+    if context:
+        try:
+            if not GEMINI_API_KEY: raise Exception("Offline")
+            model = genai.GenerativeModel("gemini-2.5-flash")
+            full_prompt = f"{sys_prompt}\nUSER: {prompt}\nDOC: {context}"
+            response_text = llm_scheduler.run(lambda: model.generate_content(full_prompt).text, priority=priority, key=("doc", full_prompt), prompt_tokens=tokens)
+            if speak: text_to_speech(response_text.replace("*", ""))
+            return response_text
+        except SchedulerBusy: return "COMMANDER: Uplink saturated. Request deferred, retry shortly."
+        except Exception as e: return f"COMMANDER: Document analysis offline. {e}"
+
+    # CASE C: TEXT/INTEL ANALYSIS (Uses Pathway Backend)
     api_url = "http://localhost:8000/v1/pw_ai_answer"
     
     try:
         # Attempt to hit the Pathway Live Engine
-        payload = {"prompt": prompt}
-        response = requests.post(api_url, json=payload, timeout=8)
+        # The backend queues the LLM call at this priority against the shared quota;
+        # here identical questions already in flight only share one backend call.
+        # The priority rides in "model" so the prompt (the retrieval query) stays clean
+        payload = {"prompt": prompt, "model": priority_hint(priority)}
+        response = llm_scheduler.run(lambda: requests.post(api_url, json=payload, timeout=BACKEND_TIMEOUT_S), priority=priority, key=("rag", priority, prompt), admit=False)
         
         if response.status_code == 200:
             # Parse response (handles direct string or JSON object)
@@ -125,35 +168,59 @@ def generate_response(prompt, image=None, sys_prompt="", speak=False):
         else:
             raise Exception(f"Pathway Status {response.status_code}")
 
+    except SchedulerBusy:
+        return "COMMANDER: Uplink saturated. Request deferred, retry shortly."
+    except requests.Timeout:
+        # Backend is up but still queued on the quota: a fallback would spend it twice
+        return "COMMANDER: Backend still processing under quota pressure. Retry shortly."
     except Exception as e:
         # FALLBACK: If Pathway is offline, use raw Gemini
         try:
             if not GEMINI_API_KEY: raise Exception("Offline")
             # FIXED: Updated fallback model to 'gemini-2.5-flash'
             model = genai.GenerativeModel("gemini-2.5-flash")
-            fallback_resp = model.generate_content(f"{sys_prompt}\nUSER: {prompt}").text
+            fallback_resp = llm_scheduler.run(lambda: model.generate_content(f"{sys_prompt}\nUSER: {prompt}").text, priority=priority, key=("gemini", sys_prompt, prompt), prompt_tokens=tokens)
             if speak: text_to_speech(fallback_resp.replace("*", ""))
             return f"[⚠️ BACKEND OFFLINE - USING FALLBACK] {fallback_resp}"
         except:
             return "COMMANDER: All secure lines are down. Check backend connection."
 
+# Windowed threat aggregates maintained by the Pathway engine (cheap to poll)
+STATS_URL = "http://localhost:8001/v1/threat_stats"
+UPLINK_URL = "http://localhost:8001/v1/llm_uplink"
+STATS_TUMBLING = timedelta(minutes=int(os.getenv("CHANAKYA_STATS_TUMBLING_MIN", "5")))  # same as threat_stats.py
+
+@st.cache_data(ttl=5)
+def fetch_threat_stats():
+    try:
+        r = requests.post(STATS_URL, json={}, timeout=2)
+        return r.json() if r.status_code == 200 else None
+    except Exception: return None
+
+@st.cache_data(ttl=5)
+def fetch_llm_uplink():
+    try:
+        r = requests.post(UPLINK_URL, json={}, timeout=2)
+        return r.json() if r.status_code == 200 else None
+    except Exception: return None
+
 def extract_pdf(f):
     try: return "".join([p.extract_text() for p in PdfReader(f).pages])
     except: return ""
 
-def draw_radar(df_intel):
+RADAR_CENTER = (28.6, 77.2)
+RADAR_RANGE_KM = 300
+
+def draw_radar(geo):
     fig = go.Figure()
     fig.add_trace(go.Scatterpolar(r=[0, 100], theta=[0, 0], mode='lines', line=dict(color='#00ff41', width=2)))
-    air = df_intel[df_intel['service'].str.contains("AIR", case=False)]
-    if not air.empty:
+    # Latest air tracks inside radar range (great-circle distance + true bearing)
+    air = [(d, row) for d, row in geo.radius(*RADAR_CENTER, RADAR_RANGE_KM, newest_first=True) if "AIR" in str(row.get('service', '')).upper()][:5]
+    if air:
         r_vals, t_vals = [], []
-        for _, row in air.tail(5).iterrows():
-            try:
-                lat_d, lon_d = float(row['lat']) - 28.6, float(row['lon']) - 77.2
-                dist = np.sqrt(lat_d**2 + lon_d**2) * 40
-                ang = np.degrees(np.arctan2(lon_d, lat_d))
-                r_vals.append(min(dist, 95)); t_vals.append(ang if ang > 0 else 360+ang)
-            except: pass
+        for dist, row in air:
+            r_vals.append(min(dist / RADAR_RANGE_KM * 100, 95))
+            t_vals.append(geo_index.bearing_deg(*RADAR_CENTER, float(row['lat']), float(row['lon'])))
         fig.add_trace(go.Scatterpolar(r=r_vals, theta=t_vals, mode='markers', marker=dict(color='#ff0000', size=15, symbol='cross'), name='HOSTILE'))
     
     fig.update_layout(
@@ -334,6 +401,7 @@ COMMANDS_DATA = [
     {"name":"Southern Navy","lat":9.93,"lon":76.26,"icon":"⚓","color":[255,255,255]},
     {"name":"Andaman Cmd","lat":11.62,"lon":92.72,"icon":"⭐","color":[0,255,0]},
 ]
+PROXIMITY_RADIUS_KM = 150
 INDIA_BORDER = "https://raw.githubusercontent.com/datameet/maps/master/Country/india-composite.geojson"
 
 # --- 8. HEADER UI ---
@@ -353,6 +421,16 @@ enable_voice = st.sidebar.checkbox("🔊 JARVIS VOICE", value=True)
 if st.sidebar.button("🔓 AUTHENTICATE AUDIO"):
     st.sidebar.success("AUDIO CHANNEL OPEN")
 
+# LLM UPLINK: scheduler queue depth and waits per priority class
+# RAG answers queue in the backend; image/VEDA/fallback calls queue here
+st.sidebar.divider()
+for label, q_stats in (("BACKEND", fetch_llm_uplink()), ("DIRECT", llm_scheduler.snapshot())):
+    if not q_stats:
+        st.sidebar.caption(f"LLM UPLINK {label} | OFFLINE")
+        continue
+    st.sidebar.caption(f"LLM UPLINK {label} | ACTIVE {q_stats['running']} | COALESCED {q_stats['coalesced']} | SHED {q_stats['rejected']}")
+    st.sidebar.dataframe(pd.DataFrame({"Queued": q_stats["queue_depth"], "Avg wait (s)": q_stats["wait_avg_s"], "Max wait (s)": q_stats["wait_max_s"]}).round(2), use_container_width=True)
+
 if user_role == "COMMANDER":
     # --- 3D TACTICAL MAP ---
     with st.container():
@@ -392,7 +470,7 @@ if user_role == "COMMANDER":
                 with st.chat_message("assistant"):
                     with st.spinner("Connecting to Live RAG Engine..."):
                         # NOW CALLS PATHWAY BACKEND
-                        res = generate_response(final, sys_prompt="ROLE: MILITARY COMMANDER.", speak=enable_voice)
+                        res = generate_response(final, sys_prompt="ROLE: MILITARY COMMANDER.", speak=enable_voice, priority="CRITICAL")
                     st.write(res)
                 st.session_state.msgs.append({"role":"assistant","content":res})
 
@@ -406,13 +484,16 @@ if user_role == "COMMANDER":
             if st.button("🔴 EXECUTE ORDER"):
                 if auth == "X-RAY-99" and order:
                     oid = random.randint(1000,9999)
-                    pd.DataFrame({"timestamp":[datetime.now().strftime("%H:%M:%S")],"id":[oid],"target":[target],"order":[order],"status":["PENDING"],"reply":["Waiting..."]}).to_csv(ORDERS_FILE, mode='a', header=False, index=False)
+                    with archive.feed_lock(ORDERS_FILE):
+                        pd.DataFrame({"timestamp":[datetime.now().isoformat(timespec="seconds")],"id":[oid],"target":[target],"order":[order],"status":["PENDING"],"reply":["Waiting..."]}).to_csv(ORDERS_FILE, mode='a', header=False, index=False)
                     st.success(f"ORDER #{oid} SENT"); time.sleep(1); st.rerun()
             st.dataframe(load_orders().iloc[::-1], use_container_width=True)
+            with st.expander("📦 ARCHIVED ORDERS"):
+                st.dataframe(archive.read_history("orders").to_pandas().iloc[::-1], use_container_width=True)
 
         with t3:
             col_r1, col_r2 = st.columns([2, 1])
-            with col_r1: st.plotly_chart(draw_radar(load_intel()), use_container_width=True)
+            with col_r1: st.plotly_chart(draw_radar(intel_geo_index(load_intel())), use_container_width=True)
             with col_r2: 
                 st.info("RADAR SWEEP ACTIVE")
                 if st.button("REFRESH TRACKS"): st.rerun()
@@ -422,7 +503,10 @@ if user_role == "COMMANDER":
             if f: 
                 txt=extract_pdf(f)
                 if q:=st.chat_input("Ask Veda..."): 
-                    st.write(generate_response(q, sys_prompt=f"DOC: {txt[:5000]}", speak=enable_voice))
+                    # Only the passages relevant to the question, packed into the token budget
+                    doc_ctx, ctx_report = context_budget.build_context(q, context_budget.split_passages(txt))
+                    st.caption(f"CONTEXT: {ctx_report['context_tokens']} TOKENS ({ctx_report['tokens_saved']} SAVED)")
+                    st.write(generate_response(q, context=doc_ctx, speak=enable_voice, priority="HIGH"))
 
         with t5:
             st.markdown("##### 🛰️ SATELLITE RECON")
@@ -461,7 +545,7 @@ if user_role == "COMMANDER":
                 verify_txt = st.text_area("Paste Intercept / Rumor", height=120)
                 if st.button("RUN TRUTH CHECK"):
                     with st.spinner("Querying Live Backend..."):
-                        check = generate_response(f"Verify this rumor based on the live news stream: {verify_txt}", speak=enable_voice)
+                        check = generate_response(f"Verify this rumor based on the live news stream: {verify_txt}", speak=enable_voice, priority="LOW")
                         st.info(check)
                 st.markdown("</div>", unsafe_allow_html=True)
 
@@ -489,6 +573,29 @@ if user_role == "COMMANDER":
                 c = "threat-critical" if p=="CRITICAL" else "alert-box"
                 st.markdown(f"<div class='{c}'><b>[{row['service']}]</b> {p}<br>{row['report']}</div>", unsafe_allow_html=True)
 
+            # PROXIMITY: reports near each command HQ in the last hour
+            st.markdown(f"<div class='glass-box'><b>📍 PROXIMITY ({PROXIMITY_RADIUS_KM} KM / 1H)</b></div>", unsafe_allow_html=True)
+            near = geo_index.proximity_alerts(intel_geo_index(df_intel), COMMANDS_DATA, PROXIMITY_RADIUS_KM, since=datetime.now() - timedelta(hours=1))
+            for a in near:
+                st.markdown(f"<div class='alert-box'><b>{a['command']}</b>: {a['count']} report(s), nearest {a['nearest_km']:.0f} km</div>", unsafe_allow_html=True)
+            if not near: st.caption("No reports near command HQs.")
+
+        # THREAT LEVEL BY SECTOR (sliding window, from the streaming engine)
+        # Independent of the local intel CSV: it comes from the JSONL pipeline
+        stats = fetch_threat_stats()
+        if stats:
+            st.markdown("<div class='glass-box'><b>📊 THREAT LEVEL BY SECTOR</b></div>", unsafe_allow_html=True)
+            # Per sector, the open window that ends soonest = the trailing window up to now
+            latest, now = {}, pd.Timestamp(datetime.now())
+            for row in stats.get("sector_sliding", []):
+                if pd.Timestamp(row['window_end']) > now: latest[row['key']] = row
+            if latest:
+                st.dataframe(pd.DataFrame([{"Sector": k, "Reports": r['count'], "Critical": r['critical']} for k, r in latest.items()]).sort_values("Reports", ascending=False), hide_index=True, use_container_width=True)
+            # Only spikes in the current tumbling window are live
+            live_spikes = [s for s in stats.get("spikes", []) if pd.Timestamp(s['window_end']) >= now - STATS_TUMBLING]
+            for s in live_spikes[:3]:
+                st.markdown(f"<div class='threat-critical'>📈 SPIKE: {s['key']} {s.get('prev_count', 0)} → {s['count']} reports</div>", unsafe_allow_html=True)
+
 elif user_role == "FIELD AGENT":
     st.title("📡 FIELD AGENT UPLINK")
     tabs = st.tabs(["🪖 ARMY", "⚓ NAVY", "✈️ AIR FORCE"])
@@ -502,7 +609,7 @@ elif user_role == "FIELD AGENT":
             lon = c2.number_input("Lon", value=77.2, format="%.4f")
             rep = c3.text_area("Situation Report", height=60)
             if st.form_submit_button("SEND TRAFFIC"):
-                pd.DataFrame({"timestamp":[datetime.now().strftime("%H:%M:%S")],"service":[service],"priority":[prio],"report":[rep],"lat":[lat],"lon":[lon]}).to_csv(INTEL_FILE, mode='a', header=False, index=False)
+                append_intel({"timestamp": datetime.now().isoformat(timespec="seconds"), "service": service, "priority": prio, "report": rep, "lat": lat, "lon": lon})
                 st.success("SENT"); time.sleep(0.5); st.rerun()
         
         st.divider()
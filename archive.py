@@ -0,0 +1,283 @@
+import argparse
+import csv
+import fcntl
+import json
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+# Columnar archive for the feeds.
+# The streamed feeds are written as one segment file per day:
+#   intel_feed/intel-YYYY-MM-DD.csv            (app.py -> chanakya.py)
+#   live_data/intel_stream-YYYY-MM-DD.jsonl    (news_streamer.py -> backend.py)
+# Pathway keeps reading them while they are open, so compaction never rewrites
+# one. A segment is closed once its day ended longer ago than the threat-stats
+# retention; closed segments are rolled into hive-partitioned Parquet under
+# archive/ exactly once. Only with --prune are archived segments removed from
+# the live directories, which also drops them from the RAG index; their
+# statistics windows have already expired by then.
+# command_orders.csv is not streamed; its EXECUTED rows are compacted in place
+# under feed_lock(), which app.py's writers hold too.
+#
+# Run periodically (cron / systemd timer):  python archive.py [--prune]
+
+ARCHIVE_DIR = os.getenv("CHANAKYA_ARCHIVE_DIR", "archive")
+INTEL_DIR = "intel_feed"
+ORDERS_FILE = "command_orders.csv"
+STREAM_DIR = "live_data"
+LOCK_DIR = ".locks"  # outside the directories Pathway reads
+HOT_ROWS = int(os.getenv("CHANAKYA_HOT_ROWS", "1000"))
+# Same setting as threat_stats.RETENTION: older windows are no longer kept
+RETENTION = timedelta(hours=int(os.getenv("CHANAKYA_STATS_RETENTION_H", "6")))
+MANIFEST = os.path.join(ARCHIVE_DIR, "segments.txt")
+SEGMENT_RE = re.compile(r"^(?P<name>.+)-(?P<day>\d{4}-\d{2}-\d{2})\.(?P<ext>csv|jsonl)$")
+
+# Partition columns come first; everything is explicitly typed so every
+# compaction run appends files with the same schema.
+SCHEMAS = {
+    "intel": pa.schema([("service", pa.string()), ("day", pa.string()),
+                        ("timestamp", pa.string()), ("priority", pa.string()), ("report", pa.string()),
+                        ("lat", pa.float64()), ("lon", pa.float64())]),
+    "orders": pa.schema([("day", pa.string()),
+                         ("timestamp", pa.string()), ("id", pa.string()), ("target", pa.string()),
+                         ("order", pa.string()), ("status", pa.string()), ("reply", pa.string())]),
+    "stream": pa.schema([("day", pa.string()),
+                         ("timestamp", pa.string()), ("source", pa.string()), ("text", pa.string())]),
+}
+PARTITIONS = {"intel": ["service", "day"], "orders": ["day"], "stream": ["day"]}
+
+
+def _day_of(ts, default):
+    # Old rows only carry HH:MM:SS; those fall back to their segment's day
+    ts = str(ts)
+    return ts[:10] if len(ts) >= 10 and ts[4] == "-" else default
+
+
+def _write(dataset, df):
+    if df.empty:
+        return 0
+    schema = SCHEMAS[dataset]
+    for field in schema:
+        if field.name not in df.columns:
+            df[field.name] = None
+        if field.name in PARTITIONS[dataset]:
+            # Blank partition values go to the hive default partition
+            df[field.name] = df[field.name].replace("", None)
+        if pa.types.is_string(field.type):
+            # object dtype first: on a float column where() would turn None back into NaN ("nan")
+            col = df[field.name].astype(object)
+            df[field.name] = col.where(col.notna(), None).map(lambda v: None if v is None else str(v))
+        else:
+            df[field.name] = pd.to_numeric(df[field.name], errors="coerce")
+    table = pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+    ds.write_dataset(
+        table,
+        os.path.join(ARCHIVE_DIR, dataset),
+        format="parquet",
+        partitioning=PARTITIONS[dataset],
+        partitioning_flavor="hive",
+        basename_template=f"part-{int(time.time())}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return table.num_rows
+
+
+@contextmanager
+def feed_lock(path):
+    """Exclusive lock on a feed file, for writers and compaction alike."""
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    with open(os.path.join(LOCK_DIR, os.path.normpath(path).replace(os.sep, "_") + ".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def intel_segment(day=None):
+    return os.path.join(INTEL_DIR, f"intel-{day or _today()}.csv")
+
+
+def stream_segment(day=None):
+    return os.path.join(STREAM_DIR, f"intel_stream-{day or _today()}.jsonl")
+
+
+def segments(directory, name):
+    """[(day, path)] of a feed's daily segments, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for f in os.listdir(directory):
+        m = SEGMENT_RE.match(f)
+        if m and m["name"] == name:
+            found.append((m["day"], os.path.join(directory, f)))
+    return sorted(found)
+
+
+def _closed(day):
+    return datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1) + RETENTION <= datetime.now()
+
+
+def _archived():
+    if not os.path.exists(MANIFEST):
+        return set()
+    with open(MANIFEST) as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def _mark_archived(path):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with open(MANIFEST, "a") as f:
+        f.write(os.path.normpath(path) + "\n")
+
+
+def _compact_segments(directory, name, dataset, parse, prune):
+    """Archives every closed, not yet archived segment; with prune, removes archived ones."""
+    done, written = _archived(), 0
+    for day, path in segments(directory, name):
+        if not _closed(day):
+            continue
+        if os.path.normpath(path) not in done:
+            df = parse(path, day)
+            if df is None:
+                continue  # left in place, reported by parse()
+            written += _write(dataset, df)
+            _mark_archived(path)
+        if prune:
+            os.remove(path)
+    return written
+
+
+def _read_csv_strict(path):
+    """All-string frame; raises ValueError on any row whose field count differs from the header."""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return pd.DataFrame()
+    header = rows[0]
+    for n, row in enumerate(rows[1:], start=2):
+        if row and len(row) != len(header):
+            raise ValueError(f"line {n}: expected {len(header)} fields, saw {len(row)}")
+    return pd.DataFrame([r for r in rows[1:] if r], columns=header)
+
+
+def _parse_intel(path, day):
+    try:
+        df = _read_csv_strict(path)
+    except ValueError as e:
+        # Archiving would silently drop the malformed line; leave the segment for a human
+        print(f"⚠️ {path}: not archived, malformed line ({e})")
+        return None
+    if df.empty:
+        return df
+    return df.assign(day=df['timestamp'].map(lambda t: _day_of(t, day)))
+
+
+def _parse_stream(path, day):
+    rows, unparsed = [], []
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                unparsed.append(line if line.endswith(b"\n") else line + b"\n")
+    if unparsed:
+        # Kept verbatim next to the archive, so pruning the segment loses nothing
+        os.makedirs(os.path.join(ARCHIVE_DIR, "unparsed"), exist_ok=True)
+        with open(os.path.join(ARCHIVE_DIR, "unparsed", os.path.basename(path)), "wb") as out:
+            out.writelines(unparsed)
+    df = pd.DataFrame(rows)
+    # Real-news items use "time" instead of "timestamp"
+    if 'timestamp' not in df.columns:
+        df['timestamp'] = df.get('time')
+    elif 'time' in df.columns:
+        df['timestamp'] = df['timestamp'].fillna(df['time'])
+    if not df.empty:
+        df['day'] = df['timestamp'].map(lambda t: _day_of(t, day))
+    return df
+
+
+def compact_intel(prune=False):
+    """Archives closed daily intel segments."""
+    return _compact_segments(INTEL_DIR, "intel", "intel", _parse_intel, prune)
+
+
+def compact_stream(prune=False):
+    """Archives closed daily stream segments."""
+    return _compact_segments(STREAM_DIR, "intel_stream", "stream", _parse_stream, prune)
+
+
+def compact_orders(hot_rows=HOT_ROWS):
+    """
+    Only EXECUTED orders older than the hot tail are closed; PENDING ones stay
+    editable. Runs under feed_lock, like app.py's order writers.
+    """
+    if not os.path.exists(ORDERS_FILE):
+        return 0
+    with feed_lock(ORDERS_FILE):
+        try:
+            df = _read_csv_strict(ORDERS_FILE)
+        except ValueError as e:
+            print(f"⚠️ {ORDERS_FILE}: not compacted, malformed line ({e})")
+            return 0
+        if len(df) <= hot_rows:
+            return 0
+        older = df.iloc[:len(df) - hot_rows]
+        closed = older[older['status'] == "EXECUTED"]
+        if closed.empty:
+            return 0
+        # Orders written before ISO timestamps fall back to the compaction day
+        cold = closed.assign(day=closed['timestamp'].map(lambda t: _day_of(t, _today())))
+        written = _write("orders", cold.copy())
+        tmp = ORDERS_FILE + ".compact"
+        df.drop(index=closed.index).to_csv(tmp, index=False)
+        os.replace(tmp, ORDERS_FILE)
+        return written
+
+
+def read_history(dataset, columns=None, where=None):
+    """
+    Reads an archived dataset ("intel", "orders" or "stream") as an Arrow table.
+    `where` maps column -> value (or list of values). Partition columns prune
+    whole directories; the rest is pushed down to Parquet row-group statistics.
+    Files are memory-mapped, so only the requested columns are paged in.
+    """
+    path = os.path.abspath(os.path.join(ARCHIVE_DIR, dataset))
+    if not os.path.exists(path):
+        return SCHEMAS[dataset].empty_table().select(columns or SCHEMAS[dataset].names)
+    dataset_ = ds.dataset(path, format="parquet", partitioning="hive",
+                          filesystem=fs.LocalFileSystem(use_mmap=True))
+    expr = None
+    for col, value in (where or {}).items():
+        cond = ds.field(col).isin(value) if isinstance(value, (list, tuple, set)) else ds.field(col) == value
+        expr = cond if expr is None else expr & cond
+    return dataset_.to_table(columns=columns, filter=expr)
+
+
+def compact_all(hot_rows=HOT_ROWS, prune=False):
+    return {
+        "intel": compact_intel(prune),
+        "orders": compact_orders(hot_rows),
+        "stream": compact_stream(prune),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll closed feed segments into the Parquet archive.")
+    parser.add_argument("--hot-rows", type=int, default=HOT_ROWS, help="orders to keep in command_orders.csv")
+    parser.add_argument("--prune", action="store_true",
+                        help="remove archived segments from the live feeds (and so from the RAG index)")
+    args = parser.parse_args()
+    for name, n in compact_all(args.hot_rows, args.prune).items():
+        print(f"📦 {name}: archived {n} row(s)")
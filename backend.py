@@ -1,26 +1,81 @@
 import pathway as pw
-# Use Local Embedder (Free, Unlimited, Fast)
-from pathway.xpacks.llm.embedders import SentenceTransformerEmbedder
 from pathway.xpacks.llm.llms import LiteLLMChat
 from pathway.xpacks.llm.question_answering import BaseRAGQuestionAnswerer
 from pathway.xpacks.llm.document_store import DocumentStore
 # Correct import for Index Factory
 from pathway.stdlib.indexing import BruteForceKnnFactory 
 import os
+import json
+import inspect
 from dotenv import load_dotenv
+import pathway_runtime
+import context_budget
+import threat_stats
+# Use Local Embedder (Free, Unlimited, Fast) - backend picked in .env
+import embedding_backend
+from scheduler import llm_scheduler, parse_priority_hint
 
 # Load Environment Variables
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+DATA_DIR = os.getenv("CHANAKYA_DATA_DIR", "live_data")
+PORT = int(os.getenv("CHANAKYA_PORT", "8000"))
+
+def schedule_args(messages, kwargs):
+    """Takes the dashboard's priority hint out of the `model` kwarg; (scheduler kwargs, llm kwargs)."""
+    model, priority = parse_priority_hint(kwargs.pop("model", None))
+    if model:
+        kwargs["model"] = model
+    prompt = json.dumps(messages.value if isinstance(messages, pw.Json) else messages, sort_keys=True, default=str)
+    return {"priority": priority or "NORMAL", "key": prompt, "prompt_tokens": context_budget.estimate_tokens(prompt)}, kwargs
+
+class ScheduledLiteLLMChat(LiteLLMChat):
+    """
+    LiteLLMChat whose calls go through the quota-aware scheduler (shared quota,
+    caller's priority, single-flight). The dashboard only coalesces requests
+    to this server, so every RAG answer is gated exactly once, here.
+    """
+    # Pathway runs a sync __wrapped__ on a worker thread; older releases had an async one
+    if inspect.iscoroutinefunction(LiteLLMChat.__wrapped__):
+        async def __wrapped__(self, messages, **kwargs):
+            call = super().__wrapped__
+            sched, kwargs = schedule_args(messages, kwargs)
+            return await llm_scheduler.arun(lambda: call(messages, **kwargs), **sched)
+    else:
+        def __wrapped__(self, messages, **kwargs):
+            call = super().__wrapped__
+            sched, kwargs = schedule_args(messages, kwargs)
+            return llm_scheduler.run(lambda: call(messages, **kwargs), **sched)
+
+class UplinkQuerySchema(pw.Schema):
+    pass
+
+@pw.udf
+def llm_uplink(query_id: pw.Pointer) -> pw.Json:
+    return pw.Json(llm_scheduler.snapshot())
+
+def serve_llm_uplink(webserver):
+    """Exposes this process's scheduler snapshot at POST /v1/llm_uplink, next to the threat stats."""
+    queries, writer = pw.io.http.rest_connector(
+        webserver=webserver,
+        route="/v1/llm_uplink",
+        schema=UplinkQuerySchema,
+        autocommit_duration_ms=50,
+        delete_completed_queries=True,
+    )
+    writer(queries.select(result=llm_uplink(pw.this.id)))
 
 class LiveRAGServer:
     def run(self):
         # 1. Input Data Stream
         # Read the raw JSONL stream
         raw_stream = pw.io.jsonlines.read(
-            "live_data/",
+            DATA_DIR,
             schema=pw.schema_from_dict({"text": str, "source": str, "timestamp": str}),
-            mode="streaming"
+            mode="streaming",
+            autocommit_duration_ms=pathway_runtime.AUTOCOMMIT_MS,
+            # Stable name so persisted offsets map back to this connector
+            name="intel_stream"
         )
 
         # 2. Transform Step
@@ -31,12 +86,21 @@ class LiveRAGServer:
             timestamp=pw.this.timestamp
         )
 
+        # Live per-sector threat statistics (windowed, updated per record)
+        stats = threat_stats.build_threat_stats(threat_stats.normalize_jsonl(raw_stream))
+        webserver = threat_stats.serve_threat_stats(stats)
+        # The dashboard shows this queue: RAG answers are admitted here, not in app.py
+        serve_llm_uplink(webserver)
+
         # 3. Define Components
         # Local Embedder (Runs on CPU, Free)
-        embedder = SentenceTransformerEmbedder(model="all-MiniLM-L6-v2")
+        # torch by default; torch-int8 / onnx / onnx-int8 for faster CPU ingest
+        # With persistence on, embeddings are cached with the checkpoint, so a
+        # restart replays the stored records without embedding them again
+        embedder = embedding_backend.make_embedder(cache_strategy=pathway_runtime.udf_cache())
         
         # FIXED: Changed model to 'gemini/gemini-2.5-flash' based on your check_models.py output
-        llm = LiteLLMChat(
+        llm = ScheduledLiteLLMChat(
             model="gemini/gemini-2.5-flash", 
             api_key=GEMINI_API_KEY,
             temperature=0.1
@@ -47,29 +111,40 @@ class LiveRAGServer:
         knn_factory = BruteForceKnnFactory(embedder=embedder)
 
         # 5. Build the RAG Pipeline
+        # Over-retrieve, then rerank/dedupe/pack into a token budget before the LLM call
         rag_app = BaseRAGQuestionAnswerer(
             llm=llm,
             indexer=DocumentStore(
                 docs=data_stream,
                 retriever_factory=knn_factory
             ),
+            search_topk=context_budget.CONTEXT_FETCH_K,
+            context_processor=context_budget.docs_to_context,
         )
 
         # 6. Build Server
         host = "0.0.0.0"
-        port = 8000
-        print(f"🚀 Pathway Engine Starting on {host}:{port}...")
+        port = PORT
+        workers = pathway_runtime.total_workers()
+        print(f"🚀 Pathway Engine Starting on {host}:{port} ({workers} worker(s))...")
         
         # This configures the REST API at /v1/pw_ai_answer
         rag_app.build_server(host=host, port=port)
         
         # 7. Run the Pipeline
-        pw.run()
+        # With CHANAKYA_PERSISTENCE_DIR set, resumes from the last checkpoint
+        persistence = pathway_runtime.persistence_config("backend")
+        if persistence:
+            print(f"💾 Checkpointing ({pathway_runtime.PERSISTENCE_MODE}) to {pathway_runtime.PERSISTENCE_DIR}/backend every {pathway_runtime.CHECKPOINT_MS} ms")
+        pw.run(persistence_config=persistence)
 
 if __name__ == "__main__":
     if not GEMINI_API_KEY:
         print("❌ ERROR: GEMINI_API_KEY not found in .env")
     else:
-        if not os.path.exists("live_data"):
-            os.makedirs("live_data")
+        if not os.path.exists(DATA_DIR):
+            os.makedirs(DATA_DIR)
+        # Multi-worker mode: re-exec under `pathway spawn` before building the graph
+        pathway_runtime.spawn_workers()
+        pathway_runtime.limit_torch_threads()
         LiveRAGServer().run()
\ No newline at end of file
@@ -0,0 +1,119 @@
+import json
+import multiprocessing as mp
+import os
+import random
+import resource
+import shutil
+import tempfile
+import time
+import pandas as pd
+import archive
+
+# File size, scan time and peak memory: text feeds vs the Parquet archive.
+# Each scan runs in a fresh process so peak RSS is not polluted by the others.
+# Run from the repo root:  python -m benchmarks.bench_archive
+
+N_ROWS = 1_000_000
+DAYS = [f"2026-09-{d:02d}" for d in range(1, 29)]  # all closed, one segment each
+SERVICES = ["ARMY", "NAVY", "AIR FORCE"]
+PRIORITIES = ["Routine", "High", "CRITICAL"]
+
+
+def make_feeds(workdir):
+    rng = random.Random(11)
+    day_of = [DAYS[i * len(DAYS) // N_ROWS] for i in range(N_ROWS)]
+    intel = pd.DataFrame({
+        "timestamp": [f"{day_of[i]}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}" for i in range(N_ROWS)],
+        "service": [rng.choice(SERVICES) for _ in range(N_ROWS)],
+        "priority": [rng.choice(PRIORITIES) for _ in range(N_ROWS)],
+        "report": [f"Patrol report {i}: movement observed at grid {rng.randint(100, 999)}." for i in range(N_ROWS)],
+        "lat": [rng.uniform(8, 35) for _ in range(N_ROWS)],
+        "lon": [rng.uniform(68, 97) for _ in range(N_ROWS)],
+    })
+    os.makedirs(os.path.join(workdir, archive.INTEL_DIR), exist_ok=True)
+    os.makedirs(os.path.join(workdir, archive.STREAM_DIR), exist_ok=True)
+    for day, part in intel.groupby(pd.Series(day_of)):
+        part.to_csv(os.path.join(workdir, archive.intel_segment(day)), index=False)
+    for day in DAYS:
+        with open(os.path.join(workdir, archive.stream_segment(day)), "w") as f:
+            for i in range(N_ROWS // len(DAYS)):
+                f.write(json.dumps({"text": f"ALERT {i}: convoy spotted.", "source": "BENCH",
+                                    "timestamp": f"{day}T10:00:00"}) + "\n")
+
+
+def feed_files(workdir, directory, name):
+    return [p for _, p in archive.segments(os.path.join(workdir, directory), name)]
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+# --- scans: "CRITICAL air force reports, report + position only" ---
+def scan_csv(workdir):
+    df = pd.concat([pd.read_csv(p) for p in feed_files(workdir, archive.INTEL_DIR, "intel")])
+    return len(df[(df['service'] == "AIR FORCE") & (df['priority'] == "CRITICAL")][['report', 'lat', 'lon']])
+
+
+def scan_parquet(workdir):
+    t = archive.read_history("intel", columns=["report", "lat", "lon"],
+                             where={"service": "AIR FORCE", "priority": "CRITICAL"})
+    return t.num_rows
+
+
+def scan_jsonl(workdir):
+    n = 0
+    for path in feed_files(workdir, archive.STREAM_DIR, "intel_stream"):
+        with open(path) as f:
+            n += sum(1 for line in f if json.loads(line)["timestamp"].startswith("2026-09-07"))
+    return n
+
+
+def scan_stream_parquet(workdir):
+    return archive.read_history("stream", columns=["text"], where={"day": "2026-09-07"}).num_rows
+
+
+def _child(fn, workdir, queue):
+    os.chdir(workdir)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    rows = fn(workdir)
+    elapsed = time.perf_counter() - t0
+    queue.put((rows, elapsed, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base) / 1024))
+
+
+def measure(fn, workdir):
+    queue = mp.Queue()
+    p = mp.Process(target=_child, args=(fn, workdir, queue))
+    p.start()
+    result = queue.get()
+    p.join()
+    return result
+
+
+if __name__ == "__main__":
+    workdir = tempfile.mkdtemp(prefix="chanakya_archive_")
+    try:
+        make_feeds(workdir)
+        csv_bytes = sum(os.path.getsize(p) for p in feed_files(workdir, archive.INTEL_DIR, "intel"))
+        jsonl_bytes = sum(os.path.getsize(p) for p in feed_files(workdir, archive.STREAM_DIR, "intel_stream"))
+        csv_res, jsonl_res = measure(scan_csv, workdir), measure(scan_jsonl, workdir)
+
+        os.chdir(workdir)
+        t0 = time.perf_counter()
+        archive.compact_intel()
+        archive.compact_stream()
+        compact_s = time.perf_counter() - t0
+        pq_res, spq_res = measure(scan_parquet, workdir), measure(scan_stream_parquet, workdir)
+
+        print(f"rows: {N_ROWS:,}  compaction: {compact_s:.1f} s")
+        print(f"{'':>16} {'size MB':>9} {'scan s':>8} {'peak MB':>9} {'rows':>9}")
+        for name, size, (rows, secs, mem) in [
+            ("intel csv", csv_bytes, csv_res),
+            ("intel parquet", dir_size(os.path.join(workdir, archive.ARCHIVE_DIR, "intel")), pq_res),
+            ("stream jsonl", jsonl_bytes, jsonl_res),
+            ("stream parquet", dir_size(os.path.join(workdir, archive.ARCHIVE_DIR, "stream")), spq_res),
+        ]:
+            print(f"{name:>16} {size / 1e6:>9.1f} {secs:>8.2f} {mem:>9.1f} {rows:>9}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,63 @@
+import random
+import time
+import context_budget
+from benchmarks.bench_workers import EVENTS, LOCATIONS
+
+# Prompt tokens and answer latency, raw top-k vs the context stage,
+# against a stub LLM whose latency grows with prompt length (like Gemini).
+# Run from the repo root:  python -m benchmarks.bench_context
+
+QUERIES = 20
+FETCH_K = 12
+RAW_K = 12
+STUB_BASE_MS = 300
+STUB_MS_PER_1K_TOKENS = 400
+
+
+def stub_llm(prompt):
+    tokens = context_budget.estimate_tokens(prompt)
+    time.sleep((STUB_BASE_MS + STUB_MS_PER_1K_TOKENS * tokens / 1000) / 1000)
+    return "COMMANDER: acknowledged."
+
+
+def fake_retrieval(query, k):
+    """Top-k as a live feed returns it: long reports, with repeated alerts."""
+    docs = []
+    for i in range(k):
+        event, loc = random.choice(EVENTS), random.choice(LOCATIONS)
+        body = f"ALERT: {event} near {loc}. " + " ".join(
+            f"Observation {j}: movement logged at grid {random.randint(100, 999)}." for j in range(random.randint(5, 25)))
+        docs.append(body)
+        if random.random() < 0.3:
+            docs.append(body)  # same alert streamed twice
+    return docs[:k]
+
+
+def prompt_for(query, context):
+    return f"LIVE INTELLIGENCE: {context}\nUSER QUERY: {query}\nAnswer using ONLY the intelligence."
+
+
+if __name__ == "__main__":
+    random.seed(7)
+    raw_tokens, packed_tokens, raw_ms, packed_ms, rerank_ms = [], [], [], [], []
+    for i in range(QUERIES):
+        query = f"Latest threat near {LOCATIONS[i % len(LOCATIONS)]}?"
+        docs = fake_retrieval(query, FETCH_K)
+
+        raw_prompt = prompt_for(query, "\n".join(f"- {d}" for d in docs[:RAW_K]))
+        t0 = time.perf_counter(); stub_llm(raw_prompt); raw_ms.append((time.perf_counter() - t0) * 1000)
+        raw_tokens.append(context_budget.estimate_tokens(raw_prompt))
+
+        t0 = time.perf_counter()
+        context, report = context_budget.build_context(query, docs)
+        rerank_ms.append((time.perf_counter() - t0) * 1000)
+        packed_prompt = prompt_for(query, context)
+        t0 = time.perf_counter(); stub_llm(packed_prompt); packed_ms.append((time.perf_counter() - t0) * 1000)
+        packed_tokens.append(context_budget.estimate_tokens(packed_prompt))
+
+    avg = lambda v: sum(v) / len(v)
+    print(f"reranker: {context_budget.CONTEXT_RERANKER}, budget: {context_budget.CONTEXT_TOKEN_BUDGET} tokens")
+    print(f"{'':>10} {'tokens/q':>10} {'llm ms':>10} {'total ms':>10}")
+    print(f"{'raw':>10} {avg(raw_tokens):>10.0f} {avg(raw_ms):>10.1f} {avg(raw_ms):>10.1f}")
+    print(f"{'packed':>10} {avg(packed_tokens):>10.0f} {avg(packed_ms):>10.1f} {avg(packed_ms) + avg(rerank_ms):>10.1f}")
+    print(f"tokens saved per query: {avg(raw_tokens) - avg(packed_tokens):.0f}")
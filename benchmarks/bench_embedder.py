@@ -0,0 +1,88 @@
+import multiprocessing as mp
+import random
+import resource
+import time
+import numpy as np
+import embedding_backend
+from benchmarks.bench_workers import EVENTS, LOCATIONS
+
+# Embeddings/sec, peak RSS and retrieval recall@10 for every embedding backend
+# and vector dtype, against the full-precision PyTorch embedder.
+# Each backend runs in a fresh process so RSS reflects that backend alone.
+# Run from the repo root:  python -m benchmarks.bench_embedder
+
+N_DOCS = 5000
+N_QUERIES = 200
+TOP_K = 10
+THREADS = 4
+VECTOR_DTYPES = ["float32", "float16", "int8"]
+
+
+def corpus():
+    rng = random.Random(13)
+    docs = [f"ALERT: {rng.choice(EVENTS)} near {rng.choice(LOCATIONS)}. "
+            f"{rng.randint(2, 40)} vehicles, grid {rng.randint(100, 999)}, {rng.choice(['dawn', 'night', 'noon'])} sighting."
+            for _ in range(N_DOCS)]
+    queries = [f"{rng.choice(EVENTS).lower()} around {rng.choice(LOCATIONS)} at {rng.choice(['dawn', 'night', 'noon'])}"
+               for _ in range(N_QUERIES)]
+    return docs, queries
+
+
+def _child(backend, queue):
+    try:
+        _measure(backend, queue)
+    except Exception as e:
+        queue.put(f"{type(e).__name__}: {e}")
+
+
+def _measure(backend, queue):
+    docs, queries = corpus()
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    model = embedding_backend.load_model(backend, threads=THREADS)
+    model.encode(docs[:64], batch_size=embedding_backend.EMBED_BATCH)  # warm-up
+    t0 = time.perf_counter()
+    doc_vecs = model.encode(docs, batch_size=embedding_backend.EMBED_BATCH, normalize_embeddings=True)
+    rate = len(docs) / (time.perf_counter() - t0)
+    query_vecs = model.encode(queries, batch_size=embedding_backend.EMBED_BATCH, normalize_embeddings=True)
+    rss_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base) / 1024
+    queue.put((rate, rss_mb, np.asarray(doc_vecs, dtype=np.float32), np.asarray(query_vecs, dtype=np.float32)))
+
+
+def run_backend(backend):
+    queue = mp.Queue()
+    p = mp.Process(target=_child, args=(backend, queue))
+    p.start()
+    result = queue.get()
+    p.join()
+    if isinstance(result, str):
+        raise RuntimeError(result)
+    return result
+
+
+def top_k(doc_vecs, query_vecs):
+    # Cosine on renormalised vectors: int8 scales differ per vector
+    scores = embedding_backend.dequantize_vectors(query_vecs) @ embedding_backend.dequantize_vectors(doc_vecs).T
+    return np.argsort(-scores, axis=1)[:, :TOP_K]
+
+
+def recall(truth, found):
+    return np.mean([len(set(t) & set(f)) / TOP_K for t, f in zip(truth, found)])
+
+
+if __name__ == "__main__":
+    _, _, base_docs, base_queries = run_backend("torch")
+    truth = top_k(base_docs, base_queries)
+
+    print(f"docs: {N_DOCS}  queries: {N_QUERIES}  threads: {THREADS}  batch: {embedding_backend.EMBED_BATCH}")
+    print(f"{'backend':>11} {'vectors':>8} {'emb/s':>8} {'RSS MB':>8} {'index MB':>9} {'recall@10':>10}")
+    for backend in embedding_backend.BACKENDS:
+        try:
+            rate, rss, docs, queries = run_backend(backend)
+        except Exception as e:
+            print(f"{backend:>11} unavailable: {e}")
+            continue
+        for dtype in VECTOR_DTYPES:
+            stored = embedding_backend.quantize_vectors(docs, dtype)
+            q = embedding_backend.quantize_vectors(queries, dtype)
+            r = recall(truth, top_k(stored, q))
+            print(f"{backend:>11} {dtype:>8} {rate:>8.0f} {rss:>8.0f} {stored.nbytes / 1e6:>9.2f} {r:>10.3f}")
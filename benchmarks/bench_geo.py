@@ -0,0 +1,59 @@
+import random
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import geo_index
+
+# Radius / bounding-box query time on the grid index vs a full (vectorised) scan.
+# Run from the repo root:  python -m benchmarks.bench_geo
+
+N_POINTS = 1_000_000
+QUERIES = 200
+RADIUS_KM = 150
+INDIA_BOX = (8.0, 35.0, 68.0, 97.0)  # min_lat, max_lat, min_lon, max_lon
+
+
+def full_scan(lats, lons, lat, lon, radius_km):
+    p1, p2 = np.radians(lat), np.radians(lats)
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(np.radians(lons - lon) / 2) ** 2
+    d = 2 * geo_index.EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+    return np.nonzero(d <= radius_km)[0]
+
+
+if __name__ == "__main__":
+    random.seed(3)
+    min_lat, max_lat, min_lon, max_lon = INDIA_BOX
+    lats = np.random.uniform(min_lat, max_lat, N_POINTS)
+    lons = np.random.uniform(min_lon, max_lon, N_POINTS)
+    now = datetime.now()
+
+    idx = geo_index.GeoIndex()
+    t0 = time.perf_counter()
+    for i in range(N_POINTS):
+        idx.add(float(lats[i]), float(lons[i]), i, now - timedelta(seconds=i % 7200))
+    build_s = time.perf_counter() - t0
+
+    centers = [(random.uniform(min_lat, max_lat), random.uniform(min_lon, max_lon)) for _ in range(QUERIES)]
+
+    t0 = time.perf_counter()
+    hits = [len(idx.radius(lat, lon, RADIUS_KM)) for lat, lon in centers]
+    index_ms = (time.perf_counter() - t0) * 1000 / QUERIES
+
+    t0 = time.perf_counter()
+    [len(idx.radius(lat, lon, RADIUS_KM, since=now - timedelta(hours=1))) for lat, lon in centers]
+    recent_ms = (time.perf_counter() - t0) * 1000 / QUERIES
+
+    t0 = time.perf_counter()
+    [len(idx.bbox(lat - 1, lat + 1, lon - 1, lon + 1)) for lat, lon in centers]
+    bbox_ms = (time.perf_counter() - t0) * 1000 / QUERIES
+
+    t0 = time.perf_counter()
+    scan_hits = [len(full_scan(lats, lons, lat, lon, RADIUS_KM)) for lat, lon in centers]
+    scan_ms = (time.perf_counter() - t0) * 1000 / QUERIES
+
+    print(f"points: {N_POINTS:,}  build: {build_s:.1f} s  ({N_POINTS / build_s:,.0f} inserts/s)")
+    print(f"radius {RADIUS_KM} km (index):        {index_ms:8.2f} ms/query, avg {sum(hits) / QUERIES:.0f} hits")
+    print(f"radius {RADIUS_KM} km, last hour:     {recent_ms:8.2f} ms/query")
+    print(f"2x2 deg bounding box (index):  {bbox_ms:8.2f} ms/query")
+    print(f"radius {RADIUS_KM} km (numpy scan):   {scan_ms:8.2f} ms/query")
+    print(f"results match: {hits == scan_hits}")
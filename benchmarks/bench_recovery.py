@@ -0,0 +1,73 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import requests
+from benchmarks.bench_workers import write_docs
+
+# Time until backend.py has indexed the whole history after a restart,
+# cold (no checkpoint) vs warm (resuming from a checkpoint). Uses the mode set
+# by CHANAKYA_PERSISTENCE_MODE (operator mode needs PATHWAY_LICENSE_KEY).
+# In input mode the warm start replays records through the embedding cache.
+# Run from the repo root:  python -m benchmarks.bench_recovery
+
+HISTORY_SIZES = [1000, 10000, 50000]
+PORT = 8766
+CHECKPOINT_MS = 2000
+TIMEOUT = 1800
+
+
+def start_backend(data_dir, state_dir):
+    env = dict(os.environ,
+               CHANAKYA_DATA_DIR=data_dir,
+               CHANAKYA_PERSISTENCE_DIR=state_dir,
+               CHANAKYA_CHECKPOINT_MS=str(CHECKPOINT_MS),
+               CHANAKYA_PORT=str(PORT),
+               GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "bench-key"))
+    return subprocess.Popen([sys.executable, "backend.py"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def time_to_indexed(n_docs):
+    """Seconds until /v1/statistics reports every document as indexed."""
+    t0 = time.time()
+    while time.time() - t0 < TIMEOUT:
+        try:
+            stats = requests.post(f"http://localhost:{PORT}/v1/statistics", json={}, timeout=2).json()
+            if stats.get("file_count", 0) >= n_docs:
+                return time.time() - t0
+        except Exception:
+            pass
+        time.sleep(0.5)
+    return None
+
+
+def run_case(n_docs):
+    data_dir = tempfile.mkdtemp(prefix="chanakya_hist_")
+    state_dir = tempfile.mkdtemp(prefix="chanakya_state_")
+    write_docs(os.path.join(data_dir, "intel_stream.jsonl"), n_docs)
+    try:
+        # Cold start: builds the index and writes the first checkpoints
+        server = start_backend(data_dir, state_dir)
+        cold = time_to_indexed(n_docs)
+        time.sleep(2 * CHECKPOINT_MS / 1000)
+        server.terminate(); server.wait()
+
+        # Warm start: should restore from the snapshot
+        server = start_backend(data_dir, state_dir)
+        warm = time_to_indexed(n_docs)
+        server.terminate(); server.wait()
+        return cold, warm
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    print(f"{'history':>8} {'cold s':>10} {'warm s':>10}")
+    for n in HISTORY_SIZES:
+        cold, warm = run_case(n)
+        fmt = lambda v: f"{v:>10.1f}" if v is not None else f"{'timeout':>10}"
+        print(f"{n:>8} {fmt(cold)} {fmt(warm)}")
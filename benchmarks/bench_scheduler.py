@@ -0,0 +1,99 @@
+import random
+import threading
+import time
+from collections import deque
+import scheduler
+
+# Burst of LOW-priority OSINT verifications (many repeated) with a few
+# CRITICAL queries mixed in, against a stub LLM that enforces a quota the
+# way Gemini does (HTTP 429 once the per-minute budget is spent).
+# Run from the repo root:  python -m benchmarks.bench_scheduler
+
+QUOTA_RPM = 30          # stub quota, requests per rolling minute
+LLM_LATENCY_S = 0.4
+LOW_REQUESTS = 60
+LOW_UNIQUE = 20
+CRITICAL_REQUESTS = 5
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class StubLLM:
+    def __init__(self, rpm):
+        self.rpm = rpm
+        self.calls = deque()
+        self.lock = threading.Lock()
+        self.total = 0
+        self.rejected = 0
+
+    def generate(self, prompt):
+        with self.lock:
+            now = time.monotonic()
+            while self.calls and now - self.calls[0] > 60:
+                self.calls.popleft()
+            if len(self.calls) >= self.rpm:
+                self.rejected += 1
+                raise QuotaExceeded("429: quota exhausted")
+            self.calls.append(now)
+            self.total += 1
+        time.sleep(LLM_LATENCY_S)
+        return f"ANSWER: {prompt}"
+
+
+def workload():
+    jobs = [("LOW", f"Verify rumor #{random.randrange(LOW_UNIQUE)}") for _ in range(LOW_REQUESTS)]
+    for i in range(CRITICAL_REQUESTS):
+        jobs.insert(random.randrange(len(jobs)), ("CRITICAL", f"Status of Northern Comd, query {i}"))
+    return jobs
+
+
+def run(jobs, use_scheduler):
+    llm = StubLLM(QUOTA_RPM)
+    sched = scheduler.QueryScheduler(concurrency=4, rpm=QUOTA_RPM, tpm=10**9, max_queue=40)
+    results = {"CRITICAL": [], "LOW": []}
+    errors = {"quota": 0, "shed": 0}
+    lock = threading.Lock()
+
+    def one(priority, prompt):
+        t0 = time.monotonic()
+        try:
+            if use_scheduler:
+                sched.run(lambda: llm.generate(prompt), priority=priority, key=prompt)
+            else:
+                llm.generate(prompt)
+            with lock:
+                results[priority].append(time.monotonic() - t0)
+        except QuotaExceeded:
+            with lock:
+                errors["quota"] += 1
+        except scheduler.SchedulerBusy:
+            with lock:
+                errors["shed"] += 1
+
+    threads = []
+    for priority, prompt in jobs:
+        t = threading.Thread(target=one, args=(priority, prompt))
+        t.start()
+        threads.append(t)
+        time.sleep(0.01)
+    for t in threads:
+        t.join()
+    return results, errors, llm, sched.snapshot() if use_scheduler else None
+
+
+if __name__ == "__main__":
+    random.seed(5)
+    jobs = workload()
+    for label, use in [("direct", False), ("scheduled", True)]:
+        results, errors, llm, snap = run(jobs, use)
+        crit = sorted(results["CRITICAL"])
+        print(f"--- {label} ---")
+        print(f"LLM calls: {llm.total}  quota 429s: {llm.rejected}  shed: {errors['shed']}")
+        print(f"CRITICAL answered: {len(crit)}/{CRITICAL_REQUESTS}  "
+              f"max latency: {max(crit) if crit else float('nan'):.2f} s")
+        print(f"LOW answered: {len(results['LOW'])}/{LOW_REQUESTS}")
+        if snap:
+            print(f"coalesced: {snap['coalesced']}  avg wait: "
+                  + ", ".join(f"{p} {w:.2f}s" for p, w in snap["wait_avg_s"].items()))
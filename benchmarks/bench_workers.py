@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+import requests
+
+# Query latency on /v1/retrieve while an ingest burst hits live_data/,
+# for 1, 2, 4 and 8 Pathway workers.
+# Run from the repo root:  python -m benchmarks.bench_workers
+
+WORKER_COUNTS = [1, 2, 4, 8]
+PORT = 8765
+WARMUP_DOCS = 200
+BURST_DOCS = 2000
+QUERIES = 40
+STARTUP_TIMEOUT = 180
+
+LOCATIONS = ["Ladakh Sector", "Siachen Glacier", "Galwan Valley", "Doklam Plateau", "LOC Poonch"]
+EVENTS = ["Troop buildup detected", "UAV airspace violation", "Artillery shelling reported", "Cyber attack on comms"]
+
+
+def write_docs(path, n, offset=0):
+    with open(path, "a") as f:
+        for i in range(n):
+            f.write(json.dumps({
+                "text": f"ALERT #{offset + i}: {EVENTS[i % len(EVENTS)]} near {LOCATIONS[i % len(LOCATIONS)]}.",
+                "source": "BENCH",
+                "timestamp": datetime.now().isoformat()
+            }) + "\n")
+
+
+def wait_ready(url):
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        try:
+            r = requests.post(url, json={"query": "status", "k": 1}, timeout=2)
+            if r.status_code == 200 and r.json():
+                return True
+        except Exception:
+            pass
+        time.sleep(1)
+    return False
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run_case(workers):
+    data_dir = tempfile.mkdtemp(prefix="chanakya_bench_")
+    stream = os.path.join(data_dir, "intel_stream.jsonl")
+    write_docs(stream, WARMUP_DOCS)
+
+    env = dict(os.environ,
+               CHANAKYA_THREADS=str(workers),
+               CHANAKYA_PROCESSES="1",
+               CHANAKYA_DATA_DIR=data_dir,
+               CHANAKYA_PERSISTENCE_DIR="",
+               CHANAKYA_PORT=str(PORT),
+               GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "bench-key"))
+    server = subprocess.Popen([sys.executable, "backend.py"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://localhost:{PORT}/v1/retrieve"
+    try:
+        if not wait_ready(url):
+            return None
+
+        # Ingest burst runs alongside the queries
+        burst = threading.Thread(target=write_docs, args=(stream, BURST_DOCS, WARMUP_DOCS))
+        burst.start()
+        latencies = []
+        for i in range(QUERIES):
+            t0 = time.perf_counter()
+            requests.post(url, json={"query": f"threat near {LOCATIONS[i % len(LOCATIONS)]}", "k": 3}, timeout=60)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        burst.join()
+        return percentile(latencies, 0.5), percentile(latencies, 0.95), max(latencies)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    print(f"{'workers':>8} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for n in WORKER_COUNTS:
+        result = run_case(n)
+        if result is None:
+            print(f"{n:>8} {'backend did not start':>32}")
+            continue
+        p50, p95, worst = result
+        print(f"{n:>8} {p50:>10.1f} {p95:>10.1f} {worst:>10.1f}")
@@ -1,6 +1,10 @@
+import os
 import pathway as pw
 from pathway.xpacks.llm.vector_store import VectorStoreServer
-from pathway.xpacks.llm import embedders, parsers
+from pathway.xpacks.llm import parsers
+import pathway_runtime
+import threat_stats
+import embedding_backend
 
 # 1. Define the Schema
 class IntelInputSchema(pw.Schema):
@@ -10,11 +14,13 @@ class IntelInputSchema(pw.Schema):
     priority: str
 
 def run_chanakya():
-    # 2. Read the CSV
+    # 2. Read the CSV segments (one per day, see archive.py)
     raw_data = pw.io.csv.read(
-        "./intel_feed.csv",
+        "./intel_feed/",
         schema=IntelInputSchema,
-        mode="streaming"
+        mode="streaming",
+        autocommit_duration_ms=pathway_runtime.AUTOCOMMIT_MS,
+        name="intel_feed"
     )
 
     # 3. TRANSFORM: The Fix
@@ -26,8 +32,11 @@ def run_chanakya():
         priority=pw.this.priority
     )
 
+    # Live per-sector threat statistics on their own port
+    threat_stats.serve_threat_stats(threat_stats.build_threat_stats(threat_stats.normalize_csv(raw_data)))
+
     # 4. Configure the Brain
-    embedder_model = embedders.SentenceTransformerEmbedder("all-MiniLM-L6-v2")
+    embedder_model = embedding_backend.make_embedder()
 
     vector_server = VectorStoreServer(
         documents,
@@ -36,7 +45,23 @@ def run_chanakya():
     )
 
     # 5. Run Server
-    vector_server.run_server(host="0.0.0.0", port=8000)
+    # VectorStoreServer manages its own pw.run(), so persist the embedder
+    # results through its cache backend: a restart skips re-embedding.
+    # Only the embedding cache is persisted here: the CSV is re-read on start
+    # and CHANAKYA_CHECKPOINT_MS does not apply.
+    if pathway_runtime.PERSISTENCE_DIR:
+        vector_server.run_server(
+            host="0.0.0.0",
+            port=8000,
+            with_cache=True,
+            cache_backend=pw.persistence.Backend.filesystem(
+                os.path.join(pathway_runtime.PERSISTENCE_DIR, "chanakya")
+            ),
+        )
+    else:
+        vector_server.run_server(host="0.0.0.0", port=8000)
 
 if __name__ == "__main__":
+    pathway_runtime.spawn_workers()
+    pathway_runtime.limit_torch_threads()
     run_chanakya()
\ No newline at end of file
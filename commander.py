@@ -1,6 +1,8 @@
 from google import genai
 import requests
 import sys
+import context_budget
+from scheduler import llm_scheduler
 
 # --- CONFIGURATION ---
 # PASTE YOUR KEY HERE
@@ -64,12 +66,19 @@ def get_best_available_model():
 ACTIVE_MODEL = get_best_available_model()
 
 def get_intel_from_chanakya(query):
-    payload = {"query": query, "k": 3} 
+    # Over-retrieve; the context stage reranks and trims to the token budget
+    payload = {"query": query, "k": context_budget.CONTEXT_FETCH_K}
     try:
         response = requests.post(CHANAKYA_URL, json=payload)
         data = response.json()
         if not data: return "No intelligence reports found."
-        return "\n".join([f"- {item['text']}" for item in data])
+        context, report = context_budget.build_context(
+            query,
+            [item['text'] for item in data],
+            scores=[-float(item.get('dist', i)) for i, item in enumerate(data)]
+        )
+        print(f"... Context: {report['passages_out']}/{report['passages_in']} reports, {report['tokens_saved']} tokens saved ...")
+        return context
     except Exception as e:
         return f"[System Error] Chanakya Offline: {e}"
 
@@ -85,9 +94,12 @@ def ask_commander(user_query, context):
     """
 
     try:
-        response = client.models.generate_content(
-            model=ACTIVE_MODEL,
-            contents=system_prompt
+        # Queue, rate-limit against the Gemini quota and coalesce repeats
+        response = llm_scheduler.run(
+            lambda: client.models.generate_content(model=ACTIVE_MODEL, contents=system_prompt),
+            priority="HIGH",
+            key=system_prompt,
+            prompt_tokens=context_budget.estimate_tokens(system_prompt)
         )
         return response.text
     except Exception as e:
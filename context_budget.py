@@ -0,0 +1,170 @@
+import os
+import re
+import numpy as np
+from dotenv import load_dotenv
+
+# Context stage between the retriever and the LLM:
+# over-retrieve -> rerank (MMR or cross-encoder) -> dedupe -> pack into a token budget.
+# Prompt tokens drive both Gemini latency and quota, so every caller goes through here.
+load_dotenv()
+
+# --- CONFIGURATION ---
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CHANAKYA_CONTEXT_TOKENS", "800"))
+CONTEXT_FETCH_K = int(os.getenv("CHANAKYA_CONTEXT_FETCH_K", "12"))
+CONTEXT_RERANKER = os.getenv("CHANAKYA_RERANKER", "mmr")  # "mmr" | "cross-encoder" | "none"
+MMR_LAMBDA = float(os.getenv("CHANAKYA_MMR_LAMBDA", "0.7"))
+DEDUPE_THRESHOLD = 0.95
+
+EMBED_MODEL = "all-MiniLM-L6-v2"
+CROSS_ENCODER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+_models = {}
+
+
+def _embedder():
+    if "embed" not in _models:
+        from sentence_transformers import SentenceTransformer
+        _models["embed"] = SentenceTransformer(EMBED_MODEL, device="cpu")
+    return _models["embed"]
+
+
+def _cross_encoder():
+    if "cross" not in _models:
+        from sentence_transformers import CrossEncoder
+        _models["cross"] = CrossEncoder(CROSS_ENCODER_MODEL, device="cpu")
+    return _models["cross"]
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 chars per token for English), good enough for budgeting."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def split_passages(text, max_chars=600):
+    """Chunks a long document (e.g. a VEDA PDF) into paragraph-sized passages."""
+    chunks, current = [], ""
+    for sentence in re.split(r"\n\s*\n|(?<=[.!?])\s+", text):
+        sentence = sentence.strip()
+        # Tables / unpunctuated text: hard-split anything longer than a chunk
+        pieces = [sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars)]
+        for part in pieces:
+            if current and len(current) + len(part) + 1 > max_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current} {part}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _normalize(text):
+    return re.sub(r"\W+", " ", text.lower()).strip()
+
+
+def _mmr(doc_vecs, relevance, top_n):
+    """Maximal Marginal Relevance: relevant passages that do not repeat each other."""
+    selected, candidates = [], list(range(len(doc_vecs)))
+    sim = doc_vecs @ doc_vecs.T
+    while candidates and len(selected) < top_n:
+        best, best_score = None, -np.inf
+        for i in candidates:
+            redundancy = max((sim[i, j] for j in selected), default=0.0)
+            score = MMR_LAMBDA * relevance[i] - (1 - MMR_LAMBDA) * redundancy
+            if score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+        candidates.remove(best)
+    return selected
+
+
+def rerank(query, passages, scores=None, reranker=None):
+    """
+    Orders passages best-first and drops duplicates.
+    `scores` (higher = better) are retriever scores; used as relevance when no query is known.
+    """
+    reranker = reranker or CONTEXT_RERANKER
+    # Exact duplicates first (the same alert is often streamed more than once)
+    seen, unique, unique_scores = set(), [], []
+    for i, p in enumerate(passages):
+        key = _normalize(p)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(p)
+            unique_scores.append(scores[i] if scores is not None else -i)
+    if len(unique) <= 1 or reranker == "none":
+        return unique
+
+    if reranker == "cross-encoder" and not query and "warned" not in _models:
+        # The backend's context processor only sees retrieved docs, never the question
+        _models["warned"] = True
+        print("⚠️ Cross-encoder needs the query; falling back to MMR on retriever scores.")
+    if reranker == "cross-encoder" and query:
+        ce_scores = _cross_encoder().predict([(query, p) for p in unique], batch_size=32)
+        order = np.argsort(-np.asarray(ce_scores))
+        return [unique[i] for i in order]
+
+    vecs = _embedder().encode(unique, batch_size=32, normalize_embeddings=True)
+    if query:
+        q = _embedder().encode([query], normalize_embeddings=True)[0]
+        relevance = vecs @ q
+    else:
+        s = np.asarray(unique_scores, dtype=float)
+        relevance = (s - s.min()) / (s.max() - s.min() or 1.0)
+    order = _mmr(vecs, relevance, len(unique))
+
+    # Near-duplicates: skip anything almost identical to a passage already kept
+    kept = []
+    for i in order:
+        if all(float(vecs[i] @ vecs[j]) < DEDUPE_THRESHOLD for j in kept):
+            kept.append(i)
+    return [unique[i] for i in kept]
+
+
+def pack(passages, budget=None):
+    """
+    Greedily keeps best-first passages until the token budget is spent.
+    If even the best passage is over budget, it is truncated rather than dropped.
+    """
+    budget = budget or CONTEXT_TOKEN_BUDGET
+    packed, used = [], 0
+    for p in passages:
+        cost = estimate_tokens(p)
+        if not packed and cost > budget:
+            p, cost = p[:budget * 4], budget
+        if used + cost > budget:
+            continue
+        packed.append(p)
+        used += cost
+    return packed
+
+
+def build_context(query, passages, scores=None, budget=None, reranker=None):
+    """
+    Full context stage. Returns (context_text, report) where report holds the
+    token accounting for this query.
+    """
+    raw_tokens = sum(estimate_tokens(p) for p in passages)
+    packed = pack(rerank(query, passages, scores=scores, reranker=reranker), budget)
+    context = "\n".join(f"- {p}" for p in packed)
+    report = {
+        "passages_in": len(passages),
+        "passages_out": len(packed),
+        "raw_tokens": raw_tokens,
+        "context_tokens": estimate_tokens(context),
+    }
+    report["tokens_saved"] = max(0, raw_tokens - report["context_tokens"])
+    return context, report
+
+
+def docs_to_context(docs):
+    """
+    Context processor for Pathway's BaseRAGQuestionAnswerer.
+    Retrieved docs arrive as pw.Json: a list of {'text', 'metadata', 'dist'} dicts.
+    """
+    docs = [d.value if hasattr(d, "value") else d for d in getattr(docs, "value", docs)]
+    texts = [d.get("text", "") if isinstance(d, dict) else str(d) for d in docs]
+    scores = [-float(d.get("dist", i)) if isinstance(d, dict) else -i for i, d in enumerate(docs)]
+    context, report = build_context(None, texts, scores=scores)
+    print(f"✂️ Context: {report['passages_out']}/{report['passages_in']} passages, "
+          f"{report['context_tokens']} tokens ({report['tokens_saved']} saved)")
+    return context
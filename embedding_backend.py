@@ -0,0 +1,107 @@
+import os
+import numpy as np
+from pathway.xpacks.llm.embedders import BaseEmbedder, SentenceTransformerEmbedder
+from dotenv import load_dotenv
+import pathway_runtime
+
+# CPU-optimised embedding backends for the Pathway pipelines.
+#   torch       full-precision PyTorch (the original SentenceTransformerEmbedder)
+#   torch-int8  PyTorch with dynamically int8-quantized Linear layers
+#   onnx        ONNX Runtime
+#   onnx-int8   ONNX Runtime with the int8-quantized export shipped with the model
+# Inference runs on a fixed thread budget, and Pathway hands the embedder
+# whole batches of rows (native UDF batching) instead of one call per row.
+load_dotenv()
+
+# --- CONFIGURATION ---
+EMBED_MODEL = "all-MiniLM-L6-v2"
+EMBED_BACKEND = os.getenv("CHANAKYA_EMBED_BACKEND", "torch")
+EMBED_THREADS = int(os.getenv("CHANAKYA_EMBED_THREADS", "0"))  # 0 = share of cores per Pathway worker
+EMBED_BATCH = int(os.getenv("CHANAKYA_EMBED_BATCH", "32"))
+ONNX_INT8_FILE = os.getenv("CHANAKYA_ONNX_INT8_FILE", "onnx/model_qint8_avx2.onnx")
+
+BACKENDS = ["torch", "torch-int8", "onnx", "onnx-int8"]
+
+
+def thread_budget():
+    return EMBED_THREADS or max(1, (os.cpu_count() or 1) // pathway_runtime.total_workers())
+
+
+def load_model(backend=EMBED_BACKEND, threads=None):
+    """Loads all-MiniLM-L6-v2 on CPU for the given backend, pinned to `threads` threads."""
+    from sentence_transformers import SentenceTransformer
+    threads = threads or thread_budget()
+
+    if backend in ("onnx", "onnx-int8"):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        model_kwargs = {"provider": "CPUExecutionProvider", "session_options": options}
+        if backend == "onnx-int8":
+            model_kwargs["file_name"] = ONNX_INT8_FILE
+        return SentenceTransformer(EMBED_MODEL, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    import torch
+    torch.set_num_threads(threads)
+    model = SentenceTransformer(EMBED_MODEL, device="cpu")
+    if backend == "torch-int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif backend != "torch":
+        raise ValueError(f"Unknown embedding backend '{backend}' (expected one of {BACKENDS})")
+    return model
+
+
+def quantize_vectors(vecs, dtype):
+    """
+    Compact storage form for L2-normalised vectors, used by the benchmark to
+    measure the recall cost of smaller vectors. int8 scales each vector by
+    its own max to [-127, 127], so norms differ between vectors: a raw dot
+    product favours documents that happened to get a larger scale. Score
+    through dequantize_vectors (cosine), which is scale-invariant, so only
+    rounding error remains. Not applied in the pipelines: Pathway's KNN index
+    stores float vectors whatever the embedder emits, so it would add error
+    and save no memory.
+    """
+    vecs = np.asarray(vecs, dtype=np.float32)
+    if dtype == "float32":
+        return vecs
+    if dtype == "float16":
+        return vecs.astype(np.float16)
+    if dtype == "int8":
+        scale = np.abs(vecs).max(axis=-1, keepdims=True)
+        return np.round(vecs / np.where(scale == 0, 1, scale) * 127).astype(np.int8)
+    raise ValueError(f"Unknown vector dtype '{dtype}'")
+
+
+def dequantize_vectors(vecs):
+    """float32, L2-renormalised form of quantize_vectors output, for cosine scoring."""
+    vecs = np.asarray(vecs, dtype=np.float32)
+    norms = np.linalg.norm(vecs, axis=-1, keepdims=True)
+    return vecs / np.where(norms == 0, 1, norms)
+
+
+class QuantizedEmbedder(BaseEmbedder):
+    """Pathway embedder on a CPU-optimised backend, fed whole batches by Pathway."""
+    def __init__(self, backend=EMBED_BACKEND, threads=None, cache_strategy=None):
+        super().__init__(max_batch_size=EMBED_BATCH, cache_strategy=cache_strategy)
+        self.backend = backend
+        self.model = load_model(backend, threads)
+
+    def __wrapped__(self, input: list[str], **kwargs) -> list[np.ndarray]:
+        return list(self.model.encode(input, batch_size=EMBED_BATCH, normalize_embeddings=True, convert_to_numpy=True))
+
+    def get_embedding_dimension(self, **kwargs):
+        return self.model.get_sentence_embedding_dimension()
+
+
+def make_embedder(cache_strategy=None):
+    """
+    The configured embedder; the default keeps the original PyTorch embedder.
+    With a `cache_strategy` (see pathway_runtime.udf_cache) embeddings are cached.
+    """
+    if EMBED_BACKEND == "torch" and cache_strategy is None:
+        return SentenceTransformerEmbedder(model=EMBED_MODEL)
+    print(f"🧮 Embedder: {EMBED_BACKEND}, {thread_budget()} thread(s), batches of {EMBED_BATCH}"
+          + (", cached" if cache_strategy else ""))
+    return QuantizedEmbedder(cache_strategy=cache_strategy)
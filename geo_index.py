@@ -0,0 +1,172 @@
+import math
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+# Incremental spatial index over intel reports.
+# Points live in fixed lat/lon grid buckets (geohash-style cells), so a radius
+# or bounding-box query only touches the few cells it overlaps instead of
+# scanning the whole feed. New reports are appended in O(1).
+# One index is shared by every Streamlit session, so sync and queries hold a lock.
+
+EARTH_RADIUS_KM = 6371.0088
+CELL_DEG = 0.5  # ~55 km cells
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bearing_deg(lat1, lon1, lat2, lon2):
+    """Initial compass bearing from point 1 to point 2 (0 = north, clockwise)."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dl = math.radians(lon2 - lon1)
+    x = math.sin(dl) * math.cos(p2)
+    y = math.cos(p1) * math.sin(p2) - math.sin(p1) * math.cos(p2) * math.cos(dl)
+    return (math.degrees(math.atan2(x, y)) + 360) % 360
+
+
+def wrap_lon(lon):
+    """Longitude in [-180, 180)."""
+    return (lon + 180.0) % 360.0 - 180.0
+
+
+def lon_ranges(min_lon, max_lon):
+    """
+    A longitude interval as ranges inside [-180, 180), split at the antimeridian.
+    min_lon > max_lon (after wrapping) also means the interval crosses it.
+    """
+    if max_lon - min_lon >= 360.0:
+        return [(-180.0, 180.0)]
+    lo, hi = wrap_lon(min_lon), wrap_lon(max_lon)
+    if lo <= hi:
+        return [(lo, hi)]
+    return [(lo, 180.0), (-180.0, hi)]
+
+
+def parse_ts(value, today=None):
+    """
+    Feed timestamps are either ISO or bare HH:MM:SS (field reports); the latter
+    mean today. Always naive local time, so they compare with datetime.now().
+    """
+    value = str(value).strip()
+    try:
+        ts = datetime.fromisoformat(value)
+        return ts.astimezone().replace(tzinfo=None) if ts.tzinfo else ts
+    except ValueError:
+        pass
+    try:
+        t = datetime.strptime(value, "%H:%M:%S").time()
+        return datetime.combine((today or datetime.now()).date(), t)
+    except ValueError:
+        return None
+
+
+class GeoIndex:
+    def __init__(self, cell_deg=CELL_DEG):
+        self.cell_deg = cell_deg
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.cells = defaultdict(list)  # (row, col) -> [point id]
+        self.lats, self.lons, self.times, self.items = [], [], [], []
+        self.synced_rows = 0
+        self.first_row = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def add(self, lat, lon, item, ts=None):
+        pid = len(self.items)
+        lon = wrap_lon(lon)
+        self.lats.append(lat); self.lons.append(lon); self.times.append(ts); self.items.append(item)
+        self.cells[self._cell(lat, lon)].append(pid)
+        return pid
+
+    def sync(self, df):
+        """
+        Appends rows of the intel dataframe not yet indexed. The CSV is
+        append-only, so only the tail is new; a shorter frame or a different
+        first row means the file was rewritten (e.g. compacted by archive.py)
+        and the index is rebuilt.
+        """
+        with self.lock:
+            first_row = tuple(map(str, df.iloc[0])) if len(df) else None
+            if len(df) < self.synced_rows or (self.synced_rows and first_row != self.first_row):
+                self._reset()
+            self.first_row = first_row
+            for _, row in df.iloc[self.synced_rows:].iterrows():
+                try:
+                    lat, lon = float(row['lat']), float(row['lon'])
+                except (TypeError, ValueError, KeyError):
+                    continue
+                if math.isnan(lat) or math.isnan(lon):
+                    continue
+                self.add(lat, lon, row.to_dict(), parse_ts(row.get('timestamp', "")))
+            self.synced_rows = len(df)
+
+    def _candidates(self, min_lat, max_lat, ranges):
+        r0, r1 = self._cell(min_lat, 0)[0], self._cell(max_lat, 0)[0]
+        for lo, hi in ranges:
+            c0, c1 = self._cell(0, lo)[1], self._cell(0, hi)[1]
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    yield from self.cells.get((r, c), ())
+
+    def _fresh(self, pid, since):
+        return since is None or (self.times[pid] is not None and self.times[pid] >= since)
+
+    def bbox(self, min_lat, max_lat, min_lon, max_lon, since=None):
+        """
+        Items inside a lat/lon box, optionally only those reported at/after `since`.
+        Boxes crossing the antimeridian are given as min_lon > max_lon (e.g. 170, -170).
+        """
+        ranges = lon_ranges(min_lon, max_lon)
+        with self.lock:
+            return [self.items[pid] for pid in self._candidates(min_lat, max_lat, ranges)
+                    if min_lat <= self.lats[pid] <= max_lat
+                    and any(lo <= self.lons[pid] <= hi for lo, hi in ranges)
+                    and self._fresh(pid, since)]
+
+    def radius(self, lat, lon, radius_km, since=None, newest_first=False):
+        """
+        (distance_km, item) pairs within radius_km of a point, nearest first
+        (or most recently reported first with newest_first=True).
+        """
+        ang = radius_km / EARTH_RADIUS_KM
+        dlat = math.degrees(ang)
+        min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+        # Longitude degrees shrink towards the poles; widen the box accordingly.
+        # A circle that reaches a pole spans every longitude.
+        if ang >= math.pi / 2 or lat + dlat >= 90 or lat - dlat <= -90 or math.sin(ang) >= math.cos(math.radians(lat)):
+            ranges = [(-180.0, 180.0)]
+        else:
+            dlon = math.degrees(math.asin(math.sin(ang) / math.cos(math.radians(lat))))
+            ranges = lon_ranges(lon - dlon, lon + dlon)
+        hits = []
+        with self.lock:
+            for pid in self._candidates(min_lat, max_lat, ranges):
+                if not self._fresh(pid, since):
+                    continue
+                d = haversine_km(lat, lon, self.lats[pid], self.lons[pid])
+                if d <= radius_km:
+                    hits.append((d, pid))
+            hits.sort(key=(lambda h: -h[1]) if newest_first else (lambda h: h[0]))
+            return [(d, self.items[pid]) for d, pid in hits]
+
+
+def proximity_alerts(index, commands, radius_km, since=None):
+    """Per-command alert feed: every command HQ with the reports that fell inside its radius."""
+    feed = []
+    for cmd in commands:
+        hits = index.radius(cmd['lat'], cmd['lon'], radius_km, since=since)
+        if hits:
+            feed.append({"command": cmd['name'], "count": len(hits), "nearest_km": hits[0][0], "reports": hits})
+    return sorted(feed, key=lambda f: f['nearest_km'])
@@ -4,18 +4,25 @@ import os
 import random
 from datetime import datetime
 from newsapi import NewsApiClient
+import archive
 
 # --- CONFIGURATION ---
 # Get a free key from https://newsapi.org/
 NEWS_API_KEY = "YOUR_NEWS_API_KEY"  # <--- REPLACE THIS if you have one
 MOCK_MODE = True  # Set to False if you put a real key above
 
-DATA_DIR = "live_data"
-STREAM_FILE = os.path.join(DATA_DIR, "intel_stream.jsonl")
+DATA_DIR = archive.STREAM_DIR
 
 # Ensure data directory exists
 os.makedirs(DATA_DIR, exist_ok=True)
 
+def push(items):
+    # One segment per day, so archive.py only ever touches closed days
+    path = archive.stream_segment()
+    with archive.feed_lock(path), open(path, "a") as f:
+        for item in items:
+            f.write(json.dumps(item) + "\n")
+
 def get_real_news():
     try:
         newsapi = NewsApiClient(api_key=NEWS_API_KEY)
@@ -35,7 +42,7 @@ def generate_mock_intel():
     }
     return intel
 
-print(f"📡 STREAMER STARTED. Writing to {STREAM_FILE}...")
+print(f"📡 STREAMER STARTED. Writing to {archive.stream_segment()}...")
 
 while True:
     new_data = None
@@ -44,15 +51,12 @@ while True:
         print("Fetching Real News...")
         news = get_real_news()
         if news:
-            with open(STREAM_FILE, "a") as f:
-                for n in news:
-                    f.write(json.dumps(n) + "\n")
+            push(news)
             print(f"--> Pushed {len(news)} real articles.")
     
     # Always push one mock event to ensure activity
     mock_event = generate_mock_intel()
-    with open(STREAM_FILE, "a") as f:
-        f.write(json.dumps(mock_event) + "\n")
+    push([mock_event])
     
     print(f"--> [LIVE] New Intel: {mock_event['text']}")
     time.sleep(10)  # Updates every 10 seconds
\ No newline at end of file
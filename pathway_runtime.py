@@ -0,0 +1,111 @@
+import os
+import shutil
+import sys
+from dotenv import load_dotenv
+
+# Shared runtime settings for the Pathway pipelines (backend.py, chanakya.py).
+# Everything is driven by .env so the same script runs on a laptop or a war-room box.
+load_dotenv()
+
+# --- WORKER CONFIGURATION ---
+# Pathway shards every table across (threads x processes) workers, so the
+# embedding UDF runs on all of them in parallel instead of queueing behind
+# the REST handler on a single worker.
+PATHWAY_THREADS = int(os.getenv("CHANAKYA_THREADS", "1"))
+PATHWAY_PROCESSES = int(os.getenv("CHANAKYA_PROCESSES", "1"))
+PATHWAY_FIRST_PORT = int(os.getenv("CHANAKYA_FIRST_PORT", "10000"))
+
+# How often connectors close a micro-batch. Smaller batches mean an ingest
+# burst is cut into slices, so queued REST queries get scheduled in between.
+AUTOCOMMIT_MS = int(os.getenv("CHANAKYA_AUTOCOMMIT_MS", "250"))
+
+# --- PERSISTENCE (CHECKPOINTING) ---
+# Off unless a directory is configured. "input" mode (free) snapshots input
+# offsets and data, so a restart does not re-read live_data/; replayed records
+# hit the embedder's UDF cache instead of being embedded again. "operator" mode
+# also snapshots operator/index state but needs a Pathway license key
+# (PATHWAY_LICENSE_KEY).
+PERSISTENCE_DIR = os.getenv("CHANAKYA_PERSISTENCE_DIR", "")
+PERSISTENCE_MODE = os.getenv("CHANAKYA_PERSISTENCE_MODE", "input")  # input | operator
+CHECKPOINT_MS = int(os.getenv("CHANAKYA_CHECKPOINT_MS", "10000"))
+PATHWAY_LICENSE_KEY = os.getenv("PATHWAY_LICENSE_KEY")
+
+
+def total_workers():
+    return max(1, PATHWAY_THREADS) * max(1, PATHWAY_PROCESSES)
+
+
+def spawn_workers():
+    """
+    Re-launches the calling script under `pathway spawn` when more than one
+    worker is configured. Does nothing when already running inside a spawned
+    worker (Pathway exports PATHWAY_THREADS to its children).
+    """
+    if total_workers() <= 1 or "PATHWAY_THREADS" in os.environ:
+        return
+
+    cli = shutil.which("pathway")
+    if not cli:
+        # No CLI on PATH: threads still work in-process, processes do not.
+        print("⚠️ 'pathway' CLI not found. Falling back to a single process.")
+        os.environ["PATHWAY_THREADS"] = str(max(1, PATHWAY_THREADS))
+        return
+
+    print(f"⚙️ Spawning {PATHWAY_PROCESSES} process(es) x {PATHWAY_THREADS} thread(s)...")
+    sys.stdout.flush()
+    os.execv(cli, [
+        cli, "spawn",
+        "--threads", str(max(1, PATHWAY_THREADS)),
+        "--processes", str(max(1, PATHWAY_PROCESSES)),
+        "--first-port", str(PATHWAY_FIRST_PORT),
+        sys.executable, *sys.argv,
+    ])
+
+
+def persistence_config(pipeline):
+    """
+    Filesystem persistence for one pipeline (each gets its own sub-directory).
+    Returns None when persistence is disabled.
+    """
+    if not PERSISTENCE_DIR:
+        return None
+    import pathway as pw
+    if PERSISTENCE_MODE == "operator":
+        if not PATHWAY_LICENSE_KEY:
+            raise ValueError("CHANAKYA_PERSISTENCE_MODE=operator requires PATHWAY_LICENSE_KEY")
+        pw.set_license_key(PATHWAY_LICENSE_KEY)
+        mode = pw.PersistenceMode.OPERATOR_PERSISTING
+    else:
+        mode = pw.PersistenceMode.PERSISTING
+    return pw.persistence.Config(
+        pw.persistence.Backend.filesystem(os.path.join(PERSISTENCE_DIR, pipeline)),
+        snapshot_interval_ms=CHECKPOINT_MS,
+        persistence_mode=mode,
+    )
+
+
+def udf_cache():
+    """
+    Cache for expensive UDFs (the embedder). Stored with the persisted state,
+    so in "input" mode the replayed records are looked up, not re-embedded.
+    """
+    if not PERSISTENCE_DIR:
+        return None
+    import pathway as pw
+    return pw.udfs.DefaultCache()
+
+
+def limit_torch_threads():
+    """
+    Splits the CPU cores between workers so N workers running the embedder
+    side by side do not each grab every core and thrash.
+    """
+    per_worker = max(1, (os.cpu_count() or 1) // total_workers())
+    os.environ.setdefault("OMP_NUM_THREADS", str(per_worker))
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    try:
+        import torch
+        torch.set_num_threads(per_worker)
+    except ImportError:
+        pass
+    return per_worker
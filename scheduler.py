@@ -0,0 +1,313 @@
+import asyncio
+import fcntl
+import heapq
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# Admission control in front of every LLM-bound request (backend RAG answers
+# and direct Gemini calls). Requests queue by priority class, run under a
+# concurrency cap, draw from token buckets sized to the Gemini quota, and
+# identical in-flight queries are coalesced into a single call.
+#
+# The buckets live in a small state file under flock, so app.py, commander.py
+# and every backend worker draw from ONE quota instead of one each.
+load_dotenv()
+
+# --- CONFIGURATION (match these to the key's gemini-2.5-flash quota) ---
+LLM_RPM = float(os.getenv("CHANAKYA_LLM_RPM", "10"))
+LLM_TPM = float(os.getenv("CHANAKYA_LLM_TPM", "250000"))
+LLM_CONCURRENCY = int(os.getenv("CHANAKYA_LLM_CONCURRENCY", "4"))
+MAX_QUEUE = int(os.getenv("CHANAKYA_LLM_MAX_QUEUE", "32"))
+# Shared by every process on this machine; empty = per-process quota
+QUOTA_FILE = os.getenv("CHANAKYA_LLM_QUOTA_FILE", os.path.join(tempfile.gettempdir(), "chanakya_llm_quota.json"))
+OUTPUT_TOKENS = 500  # expected answer size, charged up front
+
+PRIORITIES = {"CRITICAL": 0, "HIGH": 1, "NORMAL": 2, "LOW": 3}
+PRIORITY_NAMES = {rank: name for name, rank in PRIORITIES.items()}
+# Share of each bucket a class must leave untouched, so low-value traffic
+# can never drain the quota that a CRITICAL query needs.
+RESERVE = {"CRITICAL": 0.0, "HIGH": 0.0, "NORMAL": 0.2, "LOW": 0.5}
+
+# The dashboard forwards its priority to backend.py in the request's "model"
+# field, which BaseRAGQuestionAnswerer hands to the LLM call but never uses
+# for retrieval (unlike "prompt").
+PRIORITY_HINT = "priority:"
+
+
+def priority_hint(priority):
+    return f"{PRIORITY_HINT}{priority}"
+
+
+def parse_priority_hint(model):
+    """(real model or None, priority or None) from a request's model field."""
+    if isinstance(model, str) and model.startswith(PRIORITY_HINT):
+        priority = model[len(PRIORITY_HINT):]
+        return None, priority if priority in PRIORITIES else None
+    return model, None
+
+
+class SchedulerBusy(Exception):
+    """Queue is full; the request was shed instead of queued."""
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.stamp = time.time()
+
+    def _refill(self):
+        now = time.time()
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self, amount, reserve=0.0):
+        """Seconds until `amount` can be taken while keeping `reserve` of capacity."""
+        self._refill()
+        # Never ask for more than a full bucket, or the request would wait forever
+        need = min(amount + reserve * self.capacity, self.capacity)
+        return 0.0 if self.tokens >= need else (need - self.tokens) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.tokens -= amount
+
+
+class Quota:
+    """Request and token buckets, optionally shared between processes through `path`."""
+    def __init__(self, rpm, tpm, path=None):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def acquire(self, cost, reserve=0.0):
+        """
+        Takes one request and `cost` tokens if both fit now; otherwise returns
+        the seconds to wait. May block on other processes (file lock).
+        """
+        with self._lock, self._synced():
+            delay = max(self.requests.wait_time(1, reserve), self.tokens.wait_time(cost, reserve))
+            if delay <= 0:
+                self.requests.take(1)
+                self.tokens.take(min(cost, self.tokens.capacity))
+            return delay
+
+    @contextmanager
+    def _synced(self):
+        if not self.path:
+            yield
+            return
+        with open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                state = json.loads(f.read() or "{}")
+                for name, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                    if name in state:
+                        bucket.tokens, bucket.stamp = state[name]
+            except ValueError:
+                pass  # unreadable state: start from full buckets
+            yield
+            f.truncate(0)
+            f.write(json.dumps({"requests": [self.requests.tokens, self.requests.stamp],
+                                "tokens": [self.tokens.tokens, self.tokens.stamp]}))
+            f.flush()
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class _Flight:
+    def __init__(self, rank):
+        self.done = threading.Event()
+        self.rank = rank
+        self.ticket = None  # [rank, seq] while the leader is queued
+        self.result = None
+        self.error = None
+
+
+class QueryScheduler:
+    def __init__(self, concurrency=LLM_CONCURRENCY, rpm=LLM_RPM, tpm=LLM_TPM, max_queue=MAX_QUEUE, quota_file=None):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.quota = Quota(rpm, tpm, quota_file)
+        self._cv = threading.Condition()
+        self._queue = []  # heap of [rank, seq]
+        self._seq = itertools.count()
+        self._running = 0
+        self._probing = False  # the head ticket is asking the quota (outside the lock)
+        self._flights = {}
+        self._stats = {p: {"served": 0, "wait_total": 0.0, "wait_max": 0.0} for p in PRIORITIES}
+        self._coalesced = 0
+        self._rejected = 0
+
+    def run(self, fn, priority="NORMAL", key=None, prompt_tokens=0, admit=True):
+        """
+        Runs fn() once admitted and returns its result. Calls sharing a `key`
+        while one is in flight wait for that call instead of making their own.
+        Raises SchedulerBusy when the queue is full (CRITICAL is never shed).
+        With admit=False the call is only coalesced; the quota is applied by
+        whoever makes the actual LLM call (e.g. backend.py).
+        """
+        priority = priority if priority in PRIORITIES else "NORMAL"
+        flight, follower = self._join(key, priority)
+        if follower:
+            flight.done.wait()
+            return self._outcome(flight)
+        try:
+            if admit:
+                self._admit(priority, prompt_tokens + OUTPUT_TOKENS, flight)
+                try:
+                    result = fn()
+                finally:
+                    self._release()
+            else:
+                result = fn()
+            self._finish(key, flight, result=result)
+            return result
+        except BaseException as e:
+            self._finish(key, flight, error=e)
+            raise
+
+    async def arun(self, fn, priority="NORMAL", key=None, prompt_tokens=0):
+        """
+        run() for coroutines: admission waits on a worker thread, while the
+        call itself (`await fn()`) stays on the caller's event loop, so async
+        clients cached on that loop keep working.
+        """
+        priority = priority if priority in PRIORITIES else "NORMAL"
+        flight, follower = self._join(key, priority)
+        if follower:
+            await asyncio.to_thread(flight.done.wait)
+            return self._outcome(flight)
+        try:
+            admission = asyncio.ensure_future(asyncio.to_thread(self._admit, priority, prompt_tokens + OUTPUT_TOKENS, flight))
+            try:
+                await asyncio.shield(admission)
+            except asyncio.CancelledError:
+                # The admitting thread cannot be stopped; give its slot back once it is admitted
+                admission.add_done_callback(lambda f: f.cancelled() or f.exception() or self._release())
+                raise
+            try:
+                result = await fn()
+            finally:
+                self._release()
+            self._finish(key, flight, result=result)
+            return result
+        except BaseException as e:
+            self._finish(key, flight, error=e)
+            raise
+
+    def _join(self, key, priority):
+        """(flight, is_follower). A more urgent follower promotes a still-queued leader."""
+        if key is None:
+            return None, False
+        rank = PRIORITIES[priority]
+        with self._cv:
+            flight = self._flights.get(key)
+            if flight is None:
+                self._flights[key] = flight = _Flight(rank)
+                return flight, False
+            self._coalesced += 1
+            if rank < flight.rank:
+                flight.rank = rank
+                if flight.ticket is not None:
+                    flight.ticket[0] = rank
+                    heapq.heapify(self._queue)
+                    self._cv.notify_all()
+            return flight, True
+
+    @staticmethod
+    def _outcome(flight):
+        if flight.error:
+            raise flight.error
+        return flight.result
+
+    def _finish(self, key, flight, result=None, error=None):
+        if not flight:
+            return
+        flight.result, flight.error = result, error
+        with self._cv:
+            self._flights.pop(key, None)
+        flight.done.set()
+
+    def _release(self):
+        with self._cv:
+            self._running -= 1
+            self._cv.notify_all()
+
+    def _admit(self, priority, cost, flight=None):
+        t0 = time.monotonic()
+        with self._cv:
+            if len(self._queue) >= self.max_queue and priority != "CRITICAL":
+                self._rejected += 1
+                raise SchedulerBusy(f"LLM queue full ({len(self._queue)} waiting)")
+            ticket = [PRIORITIES[priority], next(self._seq)]
+            heapq.heappush(self._queue, ticket)
+            if flight:
+                flight.ticket = ticket
+        try:
+            while True:
+                with self._cv:
+                    while not (self._queue[0] is ticket and self._running < self.concurrency and not self._probing):
+                        self._cv.wait(timeout=1.0)
+                    self._probing = True
+                    # Followers may have promoted the ticket since it was queued
+                    priority = PRIORITY_NAMES[ticket[0]]
+                # The quota may wait on another process's file lock: never under self._cv
+                delay = None
+                try:
+                    delay = self.quota.acquire(cost, RESERVE[priority])
+                finally:
+                    with self._cv:
+                        self._probing = False
+                        if delay is not None and delay <= 0:
+                            self._admitted(ticket, priority, flight, time.monotonic() - t0)
+                            return
+                        self._cv.notify_all()
+                        if delay is not None:
+                            self._cv.wait(timeout=delay)
+        except BaseException:
+            with self._cv:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                self._cv.notify_all()
+            raise
+
+    def _admitted(self, ticket, priority, flight, wait):
+        """Bookkeeping once the head ticket got its quota. Caller holds self._cv."""
+        heapq.heappop(self._queue)
+        if flight:
+            flight.ticket = None
+        self._running += 1
+        s = self._stats[priority]
+        s["served"] += 1
+        s["wait_total"] += wait
+        s["wait_max"] = max(s["wait_max"], wait)
+        self._cv.notify_all()
+
+    def snapshot(self):
+        """Queue depth, in-flight calls and wait times per priority class."""
+        with self._cv:
+            depth = {p: 0 for p in PRIORITIES}
+            for rank, _ in self._queue:
+                depth[PRIORITY_NAMES[rank]] += 1
+            return {
+                "queue_depth": depth,
+                "running": self._running,
+                "coalesced": self._coalesced,
+                "rejected": self._rejected,
+                "wait_avg_s": {p: (s["wait_total"] / s["served"] if s["served"] else 0.0) for p, s in self._stats.items()},
+                "wait_max_s": {p: s["wait_max"] for p, s in self._stats.items()},
+            }
+
+
+# Process-wide scheduler; the quota itself is shared with the other processes via QUOTA_FILE
+llm_scheduler = QueryScheduler(quota_file=QUOTA_FILE or None)
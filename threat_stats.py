@@ -0,0 +1,196 @@
+import json
+import os
+import re
+from datetime import timedelta
+import pathway as pw
+from dotenv import load_dotenv
+from geo_index import parse_ts
+
+# Incremental threat statistics inside the Pathway graph.
+# Every record already flows through backend.py / chanakya.py, so the counts
+# per sector, severity and event type are maintained as windowed reductions:
+# each new record only touches the windows it falls into (O(delta)), and
+# windows older than the retention cutoff are dropped from state.
+load_dotenv()
+
+# --- CONFIGURATION ---
+STATS_PORT = int(os.getenv("CHANAKYA_STATS_PORT", "8001"))
+TUMBLING = timedelta(minutes=int(os.getenv("CHANAKYA_STATS_TUMBLING_MIN", "5")))
+SLIDING = timedelta(minutes=int(os.getenv("CHANAKYA_STATS_SLIDING_MIN", "15")))
+SLIDING_HOP = timedelta(minutes=1)
+RETENTION = timedelta(hours=int(os.getenv("CHANAKYA_STATS_RETENTION_H", "6")))
+SPIKE_FACTOR = 2.0
+SPIKE_MIN_COUNT = 3
+
+# Sector-keyed tables are served per sector; the rest to every query
+SECTOR_KINDS = ("sector", "sector_sliding", "spikes")
+GLOBAL_SCOPE = "*"
+ALL_SECTORS_SCOPE = "*sectors"
+
+ALERT_PATTERN = re.compile(r"ALERT: (?P<event>.+?) near (?P<sector>.+?)\. Severity: (?P<severity>\w+)")
+
+
+class StatsQuerySchema(pw.Schema):
+    sector: str | None = pw.column_definition(default_value=None)
+
+
+@pw.udf
+def parse_alert(text: str) -> tuple[str, str, str]:
+    """(sector, severity, event) from a streamed alert; anything else counts as news."""
+    m = ALERT_PATTERN.search(text or "")
+    if not m:
+        return ("UNKNOWN", "Info", "News")
+    return (m["sector"].strip(), m["severity"].strip(), m["event"].strip())
+
+
+@pw.udf
+def parse_time(value: str) -> pw.DateTimeNaive | None:
+    return parse_ts(value)
+
+
+def normalize_jsonl(stream):
+    """live_data/*.jsonl rows (text, source, timestamp) -> events table."""
+    parsed = stream.select(ts=parse_time(pw.this.timestamp), alert=parse_alert(pw.this.text))
+    return parsed.filter(pw.this.ts.is_not_none()).select(
+        ts=pw.unwrap(pw.this.ts),
+        sector=pw.this.alert[0],
+        severity=pw.this.alert[1],
+        event=pw.this.alert[2],
+    )
+
+
+def normalize_csv(intel):
+    """intel_feed rows (timestamp, sector, priority, report) -> events table."""
+    parsed = intel.select(ts=parse_time(pw.this.timestamp), sector=pw.this.sector, severity=pw.this.priority)
+    return parsed.filter(pw.this.ts.is_not_none()).select(
+        ts=pw.unwrap(pw.this.ts),
+        sector=pw.this.sector,
+        severity=pw.this.severity,
+        event="Field report",
+    )
+
+
+def _windowed(events, key, window):
+    critical = pw.apply_with_type(lambda s: int(str(s).strip().upper() == "CRITICAL"), int, pw.this.severity)
+    return events.windowby(
+        pw.this.ts,
+        window=window,
+        instance=pw.this[key],
+        behavior=pw.temporal.common_behavior(cutoff=RETENTION, keep_results=False),
+    ).reduce(
+        key=pw.this._pw_instance,
+        window_start=pw.this._pw_window_start,
+        window_end=pw.this._pw_window_end,
+        count=pw.reducers.count(),
+        critical=pw.reducers.sum(critical),
+    )
+
+
+def build_threat_stats(events):
+    """
+    Windowed aggregates over an events table (ts, sector, severity, event).
+    Returns a dict of tables: tumbling counts by sector/severity/event,
+    sliding counts by sector, and per-sector rate-of-change spikes.
+    """
+    tumbling = pw.temporal.tumbling(duration=TUMBLING)
+    stats = {
+        "sector": _windowed(events, "sector", tumbling),
+        "severity": _windowed(events, "severity", tumbling),
+        "event": _windowed(events, "event", tumbling),
+        "sector_sliding": _windowed(events, "sector", pw.temporal.sliding(hop=SLIDING_HOP, duration=SLIDING)),
+    }
+
+    # Spike = this window vs the previous window of the same sector
+    delta = stats["sector"].join_left(
+        stats["sector"].copy(), pw.left.key == pw.right.key, pw.left.window_start == pw.right.window_end
+    ).select(
+        key=pw.left.key,
+        window_start=pw.left.window_start,
+        window_end=pw.left.window_end,
+        count=pw.left.count,
+        critical=pw.left.critical,
+        prev_count=pw.coalesce(pw.right.count, 0),
+    )
+    stats["spikes"] = delta.filter(
+        (pw.this.count >= SPIKE_MIN_COUNT) & (pw.this.count >= SPIKE_FACTOR * pw.this.prev_count)
+    )
+    return stats
+
+
+def _as_rows(kind, table):
+    prev_count = pw.this.prev_count if kind == "spikes" else -1
+    return table.select(
+        kind=kind,
+        key=pw.this.key,
+        payload=pw.apply_with_type(
+            lambda key, start, end, count, critical, prev: json.dumps({
+                "key": key, "window_start": str(start), "window_end": str(end),
+                "count": count, "critical": critical,
+                **({"prev_count": prev} if prev >= 0 else {})}),
+            str,
+            pw.this.key, pw.this.window_start, pw.this.window_end, pw.this.count, pw.this.critical, prev_count,
+        ),
+    )
+
+
+def _scoped_rows(stats):
+    """
+    One row per (kind, window, key), tagged with the scope a query looks it up
+    by: its own sector, every sector, or global (severity / event).
+    """
+    parts = []
+    for kind, table in stats.items():
+        rows = _as_rows(kind, table)
+        if kind in SECTOR_KINDS:
+            parts.append(rows.select(pw.this.kind, pw.this.payload, scope=pw.this.key))
+            parts.append(rows.select(pw.this.kind, pw.this.payload, scope=ALL_SECTORS_SCOPE))
+        else:
+            parts.append(rows.select(pw.this.kind, pw.this.payload, scope=GLOBAL_SCOPE))
+    return pw.Table.concat_reindex(*parts)
+
+
+@pw.udf
+def query_scopes(sector: str | None) -> list[str]:
+    return [sector or ALL_SECTORS_SCOPE, GLOBAL_SCOPE]
+
+
+@pw.udf
+def format_stats(rows: tuple) -> pw.Json:
+    result = {kind: [] for kind in ("sector", "severity", "event", "sector_sliding", "spikes")}
+    for kind, payload in rows:
+        if kind is None:  # scope with no rows yet
+            continue
+        result[kind].append(json.loads(payload))
+    for kind in result:
+        result[kind].sort(key=lambda r: (r["window_start"], r["key"]), reverse=True)
+    return pw.Json(result)
+
+
+def serve_threat_stats(stats, host="0.0.0.0", port=STATS_PORT):
+    """
+    Exposes the aggregates at POST /v1/threat_stats (optional {"sector": ...}).
+    Each stats row is kept as its own row, indexed by scope. A query is
+    answered against the current state only (asof-now join) and reads just
+    the rows in its scopes, so a poll never recomputes or copies the rest.
+    Returns the webserver, so other routes can share the port.
+    """
+    rows = _scoped_rows(stats)
+
+    webserver = pw.io.http.PathwayWebserver(host=host, port=port, with_cors=True)
+    queries, writer = pw.io.http.rest_connector(
+        webserver=webserver,
+        route="/v1/threat_stats",
+        schema=StatsQuerySchema,
+        autocommit_duration_ms=50,
+        delete_completed_queries=True,
+    )
+    lookups = queries.select(query_id=pw.this.id, scope=query_scopes(pw.this.sector)).flatten(pw.this.scope)
+    matched = lookups.asof_now_join_left(rows, pw.left.scope == pw.right.scope).select(
+        query_id=pw.left.query_id, kind=pw.right.kind, payload=pw.right.payload
+    )
+    answers = matched.groupby(pw.this.query_id, id=pw.this.query_id).reduce(
+        rows=pw.reducers.tuple(pw.make_tuple(pw.this.kind, pw.this.payload))
+    ).select(result=format_stats(pw.this.rows))
+    writer(answers)
+    print(f"📊 Threat statistics on {host}:{port}/v1/threat_stats")
+    return webserver